@@ -1,19 +1,26 @@
 import logging
+import math
 import re
+from functools import lru_cache
 from operator import itemgetter
-from pyxdameraulevenshtein import normalized_damerau_levenshtein_distance_ndarray
 from typing import List, Tuple  # TODO PEP 484 & type checks
 
 import numpy as np
 import pymorphy2
 
 import helpers
+from ITermExtractor import executor
 from ITermExtractor.Structures.Case import Case, CaseNameConverter
 from ITermExtractor.Structures.PartOfSpeech import PartOfSpeech, POSNameConverter
 from ITermExtractor.Structures.WordStructures import TaggedWord, Collocation, non_whitespace_separators, Separator
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
 
 LENGTH_LIMIT_PER_PROCESS = 200
 DIST_THRESHOLD = 0.15
+INFLECTION_CACHE_SIZE = 65536
+PARALLEL_NORMAL_FORM_LIMIT = 5000  # с какого количества словосочетаний нормальные формы ищутся в нескольких процессах
+GENITIVE = frozenset({'gent'})
+NOMINATIVE = frozenset({'nomn'})
 __MorphAnalyzer__ = pymorphy2.MorphAnalyzer()
 
 
@@ -271,33 +278,6 @@ def is_identical_collocation_q(collocation1: List[TaggedWord], collocation2: Lis
     return is_identical
 
 
-def binary_identity_check(collocation: List[TaggedWord], collocation_list: List[Tuple[int, List[TaggedWord]]]) -> List[
-    Tuple[int, bool]]:  # индекс, True/False
-    """
-    Проверяет наличие словосочетания в списке бинарным поиском
-    :param collocation: словосочетание
-    :param collocation_list: список словосочетаний с индексами
-    :return: результирующий список (индекс, найдено/не найдено)
-
-    >>> collocation_info = [tag_collocation(i) for i in ['огонь артиллерии', 'вызов огня артиллерии', 'огня артиллерии большой мощности', 'огня артиллерии']]
-    >>> binary_identity_check(collocation_info[0], list(enumerate(collocation_info)))
-    [(0, True), (1, False), (2, False), (3, True)]
-    """
-    if len(collocation_list) == 1:
-        tmp = collocation_list[0]
-        return [(tmp[0], is_identical_collocation_q(collocation, tmp[1]))]
-    else:
-        middle_index = int(len(collocation_list) / 2)
-        first_half = collocation_list[:middle_index]
-        second_half = collocation_list[middle_index:]
-        first_result = binary_identity_check(collocation, first_half)
-        second_result = binary_identity_check(collocation, second_half)
-        result = [] + first_result + second_result
-        return result
-        # LENGTH_LIMIT_PER_PROCESS
-    # [(is_identical_collocation_q(collocation, coll[1]), coll[0], coll[1]) for coll in enumerate(collocation_list)]
-
-
 def in_collocation_list_var(collocation: str, collocation_list: List[str]) -> Tuple[bool, str]:
     # TODO мб возвращать термин в нормальной форме, если попадается в collocation? mainword в и.п.
     # TODO overcomplicated
@@ -348,6 +328,19 @@ def in_collocation_list_var(collocation: str, collocation_list: List[str]) -> Tu
     return flag, collocation_list[found_index] if found_index > -1 else None
 
 
+def get_signature(collocation: List[TaggedWord]) -> Tuple[str, ...]:
+    """
+    Сигнатура словосочетания - нормальные формы его слов. Словосочетания с равными сигнатурами
+    совпадают с точностью до словоформы (см. is_identical_collocation_q) и группируются по хэшу сигнатуры
+    :param collocation: словосочетание с тегами
+    :return: кортеж нормальных форм
+
+    >>> get_signature(tag_collocation('огня артиллерии')) == get_signature(tag_collocation('огонь артиллерии'))
+    True
+    """
+    return tuple(word.normalized for word in collocation)
+
+
 def count_includes(collocation: List[TaggedWord], collocation_list: List[List[TaggedWord]]) -> List[
     Tuple[int, List[TaggedWord]]]:
     """
@@ -366,10 +359,8 @@ def count_includes(collocation: List[TaggedWord], collocation_list: List[List[Ta
     if not isinstance(collocation_list, list):
         raise TypeError("Ошибка типов. Необходим список словосочетаний")
 
-    # flag = collocation in collocation_list
-    # identity_check = [(is_identical_collocation_q(collocation, coll[1]), coll[0], coll[1]) for coll in enumerate(collocation_list)]  # True/False, index, collocation
-    identity_check = binary_identity_check(collocation, list(enumerate(collocation_list)))
-    found_matches = [(id_tuple[0], collocation_list[id_tuple[0]]) for id_tuple in identity_check if id_tuple[1]]
+    signature = get_signature(collocation)
+    found_matches = [(index, coll) for index, coll in enumerate(collocation_list) if get_signature(coll) == signature]
     return found_matches
 
 
@@ -501,47 +492,179 @@ def get_biword_coll_normal_form(collocation: List[TaggedWord]) -> str:
         if word.word == main_word or word.pos == PartOfSpeech.adjective:
             normalized_collocation.append(word.normalized)
         else:
-            parse_info = __MorphAnalyzer__.parse(word.word)
-            # the_word = list(filter(lambda o: CaseNameConverter.to_name(word.case) == o.tag.case, parse_info))[0]
-            the_word = next(iter(filter(lambda o: CaseNameConverter.to_name(word.case) == o.tag.case, parse_info)),
-                            None)
-            if the_word is None:
-                print('why? Было передано отпарсенное слово с неверным падежом?! {0}, чр {1}, п. {2}'
-                      .format(word.word, word.pos, word.case))
-                lexeme = next(iter(parse_info)).word
-            else:
-                lexeme = the_word.inflect({'gent'}).word
-            normalized_collocation.append(lexeme)
+            normalized_collocation.append(inflect_word(word.word, word.case, GENITIVE))
     return ' '.join(normalized_collocation)
 
 
+@lru_cache(maxsize=INFLECTION_CACHE_SIZE)
+def inflect_word(word: str, case: Case, grammemes: frozenset) -> str:
+    """
+    Ставит слово, встреченное в падеже case, в форму с заданными граммемами.
+    Результаты кэшируются: зависимые слова повторяются в тысячах словосочетаний
+    :param word: слово
+    :param case: падеж, в котором слово встретилось
+    :param grammemes: граммемы pymorphy2 требуемой формы
+    :return: словоформа
+
+    >>> inflect_word('артиллерия', Case.nominative, GENITIVE)
+    'артиллерии'
+    """
+    parse_info = __MorphAnalyzer__.parse(word)
+    # the_word = list(filter(lambda o: CaseNameConverter.to_name(word.case) == o.tag.case, parse_info))[0]
+    the_word = next(iter(filter(lambda o: CaseNameConverter.to_name(case) == o.tag.case, parse_info)), None)
+    if the_word is None:
+        logging.warning('Было передано отпарсенное слово с неверным падежом? {0}, п. {1}'.format(word, case))
+        return next(iter(parse_info)).word
+    inflected = the_word.inflect(set(grammemes))
+    return inflected.word if inflected is not None else the_word.word
+
+
 def get_collocation_normal_form(pnormal_form: str, collocations: List[Collocation], main_word: str) -> int:
     """
     Из перечня словосочетаний выбирает словосочетание, находящееся в нормальной форме
     Используется в случаях, когда необходимо выявить нормальную форму из списка словосочетаний
     ('огонь артиллерии', 'огня артиллерии') -> 'огонь артиллерии'
+    Выбирается ближайшая к псевдонормальной форме словоформа, содержащая главное слово, если она отстоит
+    от ближайшей из всех словоформ не более чем на DIST_THRESHOLD. Совпадение с псевдонормальной формой
+    прекращает поиск, расстояния считаются лишь до уже достигнутой границы
     Возвращает индекс
     :param main_word: главное слово в словосочетании
     :param pnormal_form: псевдонормальная форма
     :param collocations: перечень словосочетаний
     :return: индекс
+
+    >>> variants = [Collocation(collocation=c, wordcount=2, freq=1) for c in ['огня артиллерии', 'огонь артиллерии']]
+    >>> get_collocation_normal_form('огонь артиллерия', variants, 'огонь')
+    1
+    """
+    pnormal_form, main_word = replace_yo(pnormal_form, collocations, main_word)
+
+    index, best, best_length = -1, 0, 1  # расстояние best / best_length - дробь, сравниваем без округлений
+    others = []
+    for i, c in enumerate(collocations):
+        if main_word not in c.collocation:
+            others.append(c.collocation)
+            continue
+        if c.collocation == pnormal_form:
+            return i
+        length = max(len(pnormal_form), len(c.collocation))
+        limit = best * length // best_length if index != -1 else length
+        distance = bounded_damerau_levenshtein_distance(pnormal_form, c.collocation, limit)
+        if distance <= limit and (index == -1 or distance * best_length < best * length):
+            index, best, best_length = i, distance, length
+    if index == -1:
+        logging.error("Что-то при выводе в лог случилось {0}".format(index, collocations))
+        return index
+
+    # выбранная словоформа должна быть не дальше DIST_THRESHOLD от ближайшей из всех
+    best_distance = np.float32(best / best_length)
+    for form in others:
+        length = max(len(pnormal_form), len(form))
+        limit = math.floor((best_distance - DIST_THRESHOLD) * length)
+        if limit < 0:
+            break
+        distance = bounded_damerau_levenshtein_distance(pnormal_form, form, limit)
+        if distance <= limit and best_distance - np.float32(distance / length) > DIST_THRESHOLD:
+            logging.error("Что-то при выводе в лог случилось {0}".format(-1, collocations))
+            return -1
+    return index
+
+
+def get_collocation_normal_forms(groups: List[Tuple[str, List[Collocation], str]],
+                                 is_single_threaded: bool = False) -> List[int]:
+    """
+    Пакетный выбор словоформ в нормальной форме, см. get_collocation_normal_form().
+    Большие наборы обрабатываются в нескольких процессах
+    :param groups: группы (псевдонормальная форма, словоформы, главное слово)
+    :param is_single_threaded: флаг, True - выполнять в одном потоке
+    :return: индексы выбранных словоформ в том же порядке
+    """
+    if is_single_threaded or len(groups) < PARALLEL_NORMAL_FORM_LIMIT:
+        return [get_collocation_normal_form(pnormal_form, collocations, main_word)
+                for pnormal_form, collocations, main_word in groups]
+    # словоформы изменяются на месте (ё -> е), в процессах пула - только копии, поэтому замена делается здесь
+    prepared = []
+    for pnormal_form, collocations, main_word in groups:
+        pnormal_form, main_word = replace_yo(pnormal_form, collocations, main_word)
+        prepared.append((pnormal_form, collocations, main_word))
+    tasks = [(prepared[task.start:task.stop], True)
+             for task in executor.split_by_cost([len(collocations) for key, collocations, main_word in prepared])]
+    logging.debug("Словоформы {0} словосочетаний выбираем в {1} задачах".format(len(groups), len(tasks)))
+    results = executor.starmap(get_collocation_normal_forms, tasks)
+    return [index for result in results for index in result]
+
+
+def replace_yo(pnormal_form: str, collocations: List[Collocation], main_word: str) -> Tuple[str, str]:
+    """
+    Заменяет ё на е в словоформах (на месте), псевдонормальной форме и главном слове,
+    если ё есть в псевдонормальной форме
+    :param pnormal_form: псевдонормальная форма
+    :param collocations: словоформы
+    :param main_word: главное слово
+    :return: псевдонормальная форма и главное слово после замены
     """
     if 'ё' in pnormal_form.lower():
         main_word = main_word.replace('ё', 'е')
         pnormal_form = pnormal_form.replace('ё', 'е')
         for c in collocations:
-            c.collocation = c.collocation.replace('ё', 'е')
-    forms = np.array([c.collocation for c in collocations])
-    distances = normalized_damerau_levenshtein_distance_ndarray(pnormal_form, forms)
-    indices = [(i, e) for i, e in enumerate(distances)
-               if e - min(distances) <= DIST_THRESHOLD and main_word in collocations[i].collocation]
-    if len(indices) > 1:  # TODO какие-то доп проверки?
-        indices = sorted(indices, key=itemgetter(1))
-    index = next(iter(indices)) if len(indices) > 0 else -1  # indices[0]
-    if index == -1:
-        logging.error("Что-то при выводе в лог случилось {0}".format(index, forms))
-        return index
-    return index[0]
+            if 'ё' in c.collocation:
+                c.collocation = c.collocation.replace('ё', 'е')
+    return pnormal_form, main_word
+
+
+def bounded_damerau_levenshtein_distance(first: str, second: str, limit: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (с перестановками соседних символов, как в pyxdameraulevenshtein),
+    вычисление прекращается, как только расстояние превысит limit
+    :param first: строка
+    :param second: строка
+    :param limit: граница расстояния
+    :return: расстояние, если оно не больше limit, иначе limit + 1
+
+    >>> bounded_damerau_levenshtein_distance('огня артиллерии', 'огонь артиллерии', 5)
+    2
+    >>> bounded_damerau_levenshtein_distance('огня', 'огонь артиллерии', 5)
+    6
+    >>> bounded_damerau_levenshtein_distance('CA', 'ABC', 5)
+    3
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    # общие начало и конец на расстояние не влияют: словоформы обычно различаются лишь окончаниями
+    start = 0
+    while start < len(first) and start < len(second) and first[start] == second[start]:
+        start += 1
+    end = 0
+    while end < len(first) - start and end < len(second) - start and first[-1 - end] == second[-1 - end]:
+        end += 1
+    first, second = first[start:len(first) - end], second[start:len(second) - end]
+    if len(first) == 0 or len(second) == 0:
+        return min(len(first) + len(second), limit + 1)
+    # считаются лишь клетки полосы |i - j| <= limit, остальные заведомо больше границы
+    exceeded = limit + 1
+    previous_row = None
+    row = [min(j, exceeded) for j in range(len(second) + 1)]
+    for i in range(1, len(first) + 1):
+        transposition_row, previous_row = previous_row, row
+        row = [exceeded] * (len(second) + 1)
+        row[0] = min(i, exceeded)
+        row_min = row[0]
+        symbol = first[i - 1]
+        for j in range(max(1, i - limit), min(len(second), i + limit) + 1):
+            value = previous_row[j - 1] if symbol == second[j - 1] else previous_row[j - 1] + 1
+            if previous_row[j] + 1 < value:
+                value = previous_row[j] + 1
+            if row[j - 1] + 1 < value:
+                value = row[j - 1] + 1
+            if i > 1 and j > 1 and symbol == second[j - 2] and first[i - 2] == second[j - 1] \
+                    and transposition_row[j - 2] + 1 < value:
+                value = transposition_row[j - 2] + 1
+            row[j] = value if value < exceeded else exceeded
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return exceeded
+    return row[-1]
 
 
 def replace_main_word(collocation: Collocation, main_word: str) -> Collocation:
@@ -559,22 +682,100 @@ def replace_main_word(collocation: Collocation, main_word: str) -> Collocation:
                        collocation.id)
 
 
-# @NotImplemented
-def get_normal_form(collocation: List[TaggedWord]) -> str:
+def get_normal_form(collocation: List[TaggedWord], surface_form: str = None) -> str:
+    """
+    Нормальная форма словосочетания из N слов с согласованием.
+    Главное слово (первое существительное) ставится в начальную форму, предшествующие ему
+    прилагательные согласуются с ним в роде и числе именительного падежа,
+    зависимые слова после главного сохраняются в словоформе surface_form
+    (или ставятся в родительный падеж, если словоформа не передана)
+    :param collocation: словосочетание с тегами (например, слова псевдонормальной формы)
+    :param surface_form: одна из встреченных в тексте словоформ того же словосочетания
+    :return: нормальная форма, пустая строка - если главное слово не найдено
+
+    >>> get_normal_form(tag_collocation('артиллерийская подготовка'))
+    'артиллерийская подготовка'
+    >>> get_normal_form(tag_collocation('огонь полковая артиллерия'), 'огнём полковой артиллерии')
+    'огонь полковой артиллерии'
+    """
     if not isinstance(collocation, list):
         raise TypeError("Аргумент должен быть списком слов")
     if len(collocation) == 0:
         return str()
+    collocation = [tag_word(word) if isinstance(word, str) else word for word in collocation]
+    if None in collocation:
+        return str()
     if len(collocation) == 1:
-        return collocation[0].normal_form
-    main_word = get_main_word(collocation)
-    for word in collocation:
-        if word == main_word:
-            pass
-        parse_info = __MorphAnalyzer__.parse(word)
-        the_word = list(filter(lambda o: CaseNameConverter.to_name(word.case) == o.tag.case, parse_info))[0]
-        the_word.inflect({'gent'})
-    # candidate_term TaggedWord
+        return collocation[0].normalized
+    head = next((i for i, word in enumerate(collocation) if word.pos == PartOfSpeech.noun), -1)
+    if head == -1:
+        return str()
+    surface = surface_form.split(' ') if surface_form is not None else []
+    if len(surface) != len(collocation):
+        surface = None
+
+    agreement = get_agreement_grammemes(collocation[head].normalized)
+    normal_form = [inflect_word(word.normalized, Case.nominative, agreement) for word in collocation[:head]]
+    normal_form.append(collocation[head].normalized)
+    if surface is not None:
+        normal_form += surface[head + 1:]
+    else:
+        dependants = collocation[head + 1:]
+        for i, word in enumerate(dependants):
+            if word.pos == PartOfSpeech.noun:
+                normal_form.append(inflect_word(word.normalized, Case.nominative, GENITIVE))
+                continue
+            noun = next((w for w in dependants[i + 1:] if w.pos == PartOfSpeech.noun), None)
+            grammemes = GENITIVE if noun is None else GENITIVE | get_agreement_grammemes(noun.normalized) - NOMINATIVE
+            normal_form.append(inflect_word(word.normalized, Case.nominative, grammemes))
+    normal_form = ' '.join(normal_form)
+    if surface is not None and 'ё' not in surface_form:  # pymorphy2 восстанавливает ё, которой нет в тексте
+        normal_form = normal_form.replace('ё', 'е')
+    return normal_form
+
+
+def get_normal_forms(collocations: List[List[TaggedWord]], surface_forms: List[str] = None,
+                     is_single_threaded: bool = False) -> List[str]:
+    """
+    Нормальные формы набора словосочетаний: из 2 слов - см. get_biword_coll_normal_form(),
+    из N слов - см. get_normal_form(). Большие наборы обрабатываются в нескольких процессах
+    :param collocations: словосочетания из слов с тегами
+    :param surface_forms: встреченные в тексте словоформы тех же словосочетаний
+    :param is_single_threaded: флаг, True - выполнять в одном потоке
+    :return: нормальные формы в том же порядке
+    """
+    if surface_forms is None:
+        surface_forms = [None] * len(collocations)
+    if is_single_threaded or len(collocations) < PARALLEL_NORMAL_FORM_LIMIT:
+        return [get_biword_coll_normal_form(collocation) if len(collocation) == 2
+                else get_normal_form(collocation, surface_form)
+                for collocation, surface_form in zip(collocations, surface_forms)]
+    tasks = [(collocations[task.start:task.stop], surface_forms[task.start:task.stop], True)
+             for task in executor.split_by_cost([len(collocation) for collocation in collocations])]
+    logging.debug("Нормальные формы {0} словосочетаний ищем в {1} задачах".format(len(collocations), len(tasks)))
+    results = executor.starmap(get_normal_forms, tasks)
+    return [normal_form for result in results for normal_form in result]
+
+
+@lru_cache(maxsize=INFLECTION_CACHE_SIZE)
+def get_agreement_grammemes(noun: str) -> frozenset:
+    """
+    Граммемы именительного падежа, с которыми согласуются прилагательные при существительном
+    :param noun: существительное в начальной форме
+    :return: граммемы pymorphy2 (падеж и род либо падеж и множественное число)
+
+    >>> sorted(get_agreement_grammemes('подготовка'))
+    ['femn', 'nomn']
+    >>> sorted(get_agreement_grammemes('сутки'))
+    ['nomn', 'plur']
+    """
+    parse_info = __MorphAnalyzer__.parse(noun)
+    the_word = next(iter(filter(lambda o: o.tag.POS == 'NOUN' and o.tag.case == 'nomn', parse_info)), None)
+    if the_word is None:
+        return NOMINATIVE
+    if the_word.tag.number == 'plur' or the_word.tag.gender is None:
+        return NOMINATIVE | {'plur'}
+    return NOMINATIVE | {the_word.tag.gender}
 
 
 def make_substrs(collocation: str) -> List[str]:  # TODO а почему артиллерия не может быть термином
@@ -660,15 +861,18 @@ def assign_tags(phrase: str or Collocation, dictionary: List[TaggedWord]) -> Lis
     return tagged_collocation
 
 
-def find_candidate_by_id(collocation_list: List[Collocation], cid: int):
-    results = [collocation for collocation in collocation_list if collocation.id == cid]
-    result = results[0] if len(results) > 0 else None
+def find_candidate_by_id(collocation_list: List[Collocation] or CandidateGraph, cid: int) -> Collocation:
+    """
+    Поиск кандидата по id. Для многократного поиска следует передавать граф вложенности (CandidateGraph):
+    в нем поиск выполняется по готовому индексу за O(1), в списке - перебором
+    :param collocation_list: список кандидатов или граф вложенности
+    :param cid: id кандидата
+    :return: кандидат, None - если не найден
+    """
+    if isinstance(collocation_list, CandidateGraph):
+        result = collocation_list.get(cid)
+    else:
+        result = next((collocation for collocation in collocation_list if collocation.id == cid), None)
     if result is None:
-        collocation_dict = dict([(r.id, r) for r in collocation_list])
-        collocation_with_links = list(filter(lambda x: len(x.llinked) > 0, collocation_list))
-        link_integrity_checks = [all(link in collocation_dict for link in p.llinked) for p in collocation_with_links]
-        flag = all(link_integrity_checks)
-        logging.debug(
-            "----> Фраза по id (#{0}) не найдена, все ли в порядке со ссылками в списке: {1}, а хоть что-то: {2}".format(
-                cid, flag, True in link_integrity_checks))
+        logging.debug("----> Фраза по id (#{0}) не найдена".format(cid))
     return result
@@ -0,0 +1,66 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from ITermExtractor.Structures.WordStructures import Collocation
+
+
+class CandidateGraph(object):
+    """
+    Граф вложенности терминологических кандидатов в сжатом построчном виде (CSR).
+    Кандидат задается позицией в списке candidates; позиции более длинных кандидатов,
+    содержащих i-го, лежат в targets[offsets[i]:offsets[i + 1]].
+    Частоты и длины хранятся в параллельных массивах, поэтому граф дешево передается в другие процессы
+    """
+
+    def __init__(self, candidates: List[Collocation]):
+        """
+        Строится один раз после расстановки ссылок llinked
+        :param candidates: терминологические кандидаты
+        """
+        self.candidates = list(candidates)
+        self.names = [candidate.collocation for candidate in self.candidates]
+        self.positions = dict((candidate.id, position) for position, candidate in enumerate(self.candidates))
+        link_counts = [len(candidate.llinked) for candidate in self.candidates]
+        self.offsets = np.zeros(len(self.candidates) + 1, dtype=np.int64)
+        np.cumsum(link_counts, out=self.offsets[1:])
+        # ссылка на отсутствующий в списке id (например, отброшенный стоп-листом) - -1
+        self.targets = np.fromiter((self.positions.get(link_id, -1)
+                                    for candidate in self.candidates for link_id in candidate.llinked),
+                                   dtype=np.int64, count=int(self.offsets[-1]))
+        self.freq = np.fromiter((candidate.freq for candidate in self.candidates), dtype=np.float64,
+                                count=len(self.candidates))
+        self.wordcount = np.fromiter((candidate.wordcount for candidate in self.candidates), dtype=np.int64,
+                                     count=len(self.candidates))
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Массивы графа без самих кандидатов - все, что нужно для подсчета метрик в другом процессе
+        :return: offsets, targets, freq, wordcount
+        """
+        return self.offsets, self.targets, self.freq, self.wordcount
+
+    def links(self, position: int) -> np.ndarray:
+        """
+        :param position: позиция кандидата
+        :return: позиции более длинных кандидатов, содержащих данный
+        """
+        return self.targets[self.offsets[position]:self.offsets[position + 1]]
+
+    def get(self, cid: int) -> Collocation:
+        """
+        :param cid: id кандидата
+        :return: кандидат, None - если кандидата нет
+        """
+        position = self.positions.get(cid, -1)
+        return self.candidates[position] if position != -1 else None
+
+    def position(self, cid: int) -> int:
+        """
+        :param cid: id кандидата
+        :return: позиция кандидата в графе, -1 - если кандидата нет
+        """
+        return self.positions.get(cid, -1)
@@ -0,0 +1,69 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from ITermExtractor.Structures.PartOfSpeech import PartOfSpeech
+from ITermExtractor.Structures.WordStructures import SentenceRun
+
+CONTEXT_POS = frozenset([PartOfSpeech.noun, PartOfSpeech.adjective, PartOfSpeech.verb, PartOfSpeech.participle])
+
+
+class ContextIndex(object):
+    """
+    Контекстные слова терминологических кандидатов: существительные, прилагательные и глаголы (причастия),
+    стоящие непосредственно перед или после вхождения кандидата.
+    Заполняется в том же проходе, что и лингвистический фильтр (LinguisticFilter.filter_runs).
+    Слова хранятся номерами в общем словаре, счетчики - разреженно, только для встреченных пар
+    """
+
+    def __init__(self):
+        self.words = []  # нормальные формы контекстных слов
+        self.word_ids = dict()  # нормальная форма -> номер в words
+        self._counts = dict()  # псевдонормальная форма кандидата -> {номер слова: частота}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, pnormal_form: str):
+        return pnormal_form in self._counts
+
+    def add_occurrence(self, pnormal_form: str, run: SentenceRun, start: int, stop: int, multiplicity: int = 1):
+        """
+        Учитывает соседей одного вхождения кандидата
+        :param pnormal_form: псевдонормальная форма кандидата
+        :param run: отрезок предложения
+        :param start: позиция первого слова кандидата в отрезке
+        :param stop: позиция за последним словом кандидата
+        :param multiplicity: сколько раз предложение встретилось в тексте
+        """
+        for position in (start - 1, stop):
+            if 0 <= position < len(run.pos) and run.pos[position] in CONTEXT_POS:
+                word = run.normal_forms[position]
+                word_id = self.word_ids.get(word, None)
+                if word_id is None:
+                    word_id = len(self.words)
+                    self.word_ids[word] = word_id
+                    self.words.append(word)
+                counts = self._counts.setdefault(pnormal_form, dict())
+                counts[word_id] = counts.get(word_id, 0) + multiplicity
+
+    def get(self, pnormal_form: str) -> dict:
+        """
+        :param pnormal_form: псевдонормальная форма кандидата
+        :return: {контекстное слово: частота}
+        """
+        return dict((self.words[word_id], count) for word_id, count in self._counts.get(pnormal_form, dict()).items())
+
+    def arrays(self, pnormal_forms: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Контекст кандидатов в сжатом построчном виде (CSR), строки - в порядке pnormal_forms
+        :param pnormal_forms: псевдонормальные формы кандидатов (например, графа вложенности)
+        :return: offsets, номера слов, частоты; контекст i-го кандидата - в [offsets[i]:offsets[i + 1]]
+        """
+        rows = [self._counts.get(pnormal_form, dict()) for pnormal_form in pnormal_forms]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=offsets[1:])
+        word_ids = np.fromiter((word_id for row in rows for word_id in row), dtype=np.int64, count=int(offsets[-1]))
+        counts = np.fromiter((count for row in rows for count in row.values()), dtype=np.float64,
+                             count=int(offsets[-1]))
+        return offsets, word_ids, counts
@@ -0,0 +1,31 @@
+from typing import List, Tuple
+
+
+def make_subgrams(words: Tuple[str, ...]) -> List[Tuple[str, ...]]:
+    """
+    Все непрерывные более короткие подпоследовательности слов (без повторов)
+    :param words: слова словосочетания
+    :return: подпоследовательности, от длинных к коротким
+
+    >>> make_subgrams(('огонь', 'полковой', 'артиллерия'))
+    [('огонь', 'полковой'), ('полковой', 'артиллерия'), ('огонь',), ('полковой',), ('артиллерия',)]
+    >>> make_subgrams(('огонь', 'огонь'))
+    [('огонь',)]
+    """
+    subgrams = dict()
+    for length in range(len(words) - 1, 0, -1):
+        for i in range(len(words) - length + 1):
+            subgrams[words[i:i + length]] = True
+    return list(subgrams)
+
+
+def make_subkeys(pnormal_form: str) -> List[str]:
+    """
+    Все непрерывные более короткие подпоследовательности слов словосочетания (без повторов)
+    :param pnormal_form: псевдонормальная форма
+    :return: подстроки из целых слов
+
+    >>> make_subkeys('огонь полковой артиллерии')
+    ['огонь полковой', 'полковой артиллерии', 'огонь', 'полковой', 'артиллерии']
+    """
+    return [' '.join(subgram) for subgram in make_subgrams(tuple(pnormal_form.split(' ')))]
@@ -1,7 +1,10 @@
-from collections import namedtuple
+from collections import namedtuple, Counter
 from copy import deepcopy
 from typing import List
 
+from ITermExtractor.Structures.Case import Case
+from ITermExtractor.Structures.PartOfSpeech import PartOfSpeech
+
 TaggedWord = namedtuple('TaggedWord', ['word', 'pos', 'case', 'normalized'])  # TODO число - ед/мн
 TaggedWord.__doc__ = "Размеченное слово"
 TaggedWord.word.__doc__ = "Слово"
@@ -14,6 +17,19 @@ Separator.__doc__ = "Разделитель слов в предложении"
 Separator.symbol.__doc__ = "Символ разделителя (запятая)"
 non_whitespace_separators = '[](),;:'
 
+SentenceRun = namedtuple('SentenceRun', ['words', 'forms', 'normal_forms', 'pos'])
+SentenceRun.__doc__ = "Отрезок предложения между разделителями, подготовленный к извлечению словосочетаний"
+SentenceRun.words.__doc__ = "Размеченные слова отрезка"
+SentenceRun.forms.__doc__ = "Словоформы в нижнем регистре"
+SentenceRun.normal_forms.__doc__ = "Нормальные формы слов в нижнем регистре"
+SentenceRun.pos.__doc__ = "Части речи слов"
+
+DuplicateStatistics = namedtuple('DuplicateStatistics', ['sentences', 'unique', 'duplicate_ratio'])
+DuplicateStatistics.__doc__ = "Статистика повторяющихся предложений корпуса"
+DuplicateStatistics.sentences.__doc__ = "Всего предложений"
+DuplicateStatistics.unique.__doc__ = "Различных предложений"
+DuplicateStatistics.duplicate_ratio.__doc__ = "Доля повторов: 1 - unique / sentences"
+
 
 class Collocation(dict):
     """
@@ -137,6 +153,99 @@ class Collocation(dict):
         return result
 
 
+class Lexicon(dict):
+    """
+    Словарь нормальных форм корпуса: нормальная форма -> слово с тегами, приведенное к нормальной форме,
+    с количеством употреблений каждой нормальной формы.
+    Строится один раз для размеченного корпуса и используется всеми фильтрами и статистическими методами
+    """
+
+    def __init__(self, sentences: List[List[TaggedWord or Separator]]=None):
+        """
+        :param sentences: размеченные предложения корпуса
+        """
+        super().__init__()
+        self.counts = Counter()
+        self.word_count = 0
+        self.part_count = 0
+        if sentences is not None:
+            self.add_sentences(sentences)
+
+    def add_sentences(self, sentences: List[List[TaggedWord or Separator]]) -> Counter:
+        """
+        Пополняет словарь словами из предложений
+        :param sentences: размеченные предложения
+        :return: количество употреблений нормальных форм в этих предложениях (например, в одном документе)
+        """
+        counts = Counter()
+        for sentence in sentences:
+            self.part_count += len(sentence)
+            for sentence_part in sentence:
+                if not isinstance(sentence_part, TaggedWord):
+                    continue
+                word = sentence_part
+                case = Case.nominative if word.pos in [PartOfSpeech.noun, PartOfSpeech.adjective] else word.case
+                self[word.normalized] = TaggedWord(word=word.normalized, pos=word.pos, case=case,
+                                                   normalized=word.normalized)  # `"большой" - потерялись теги
+                counts[word.normalized] += 1
+        self.counts.update(counts)
+        self.word_count += sum(counts.values())
+        return counts
+
+
+class CorpusStatistics(object):
+    """
+    Частоты нормальных форм по документам и словарь нормальных форм корпуса (Lexicon), собранные за один проход.
+    Вероятности встречаемости слов (GlossEx) вычисляются обращением к счетчикам, без повторного просмотра текста
+    """
+
+    def __init__(self, documents: List[List[List[TaggedWord or Separator]]]):
+        """
+        :param documents: документы, разбитые на размеченные предложения
+        """
+        self.lexicon = Lexicon()  # словарь и частоты нормальных форм всего корпуса
+        self.documents = []  # счетчики нормальных форм каждого документа
+        self.document_totals = []  # количество размеченных слов в каждом документе
+        for document in documents:
+            counts = self.lexicon.add_sentences(document)
+            self.documents.append(counts)
+            self.document_totals.append(sum(counts.values()))
+        self._max_probabilities = dict()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def probability(self, normal_form: str) -> float:
+        """
+        :param normal_form: нормальная форма слова
+        :return: доля употреблений слова среди всех размеченных слов корпуса
+        """
+        total = self.lexicon.word_count
+        return self.lexicon.counts[normal_form] / total if total > 0 else 0
+
+    def document_probability(self, normal_form: str, index: int) -> float:
+        """
+        :param normal_form: нормальная форма слова
+        :param index: номер документа
+        :return: доля употреблений слова среди размеченных слов документа
+        """
+        total = self.document_totals[index]
+        return self.documents[index][normal_form] / total if total > 0 else 0
+
+    def max_document_probability(self, normal_form: str) -> float:
+        """
+        Наибольшая по документам вероятность встретить слово (кэшируется)
+        :param normal_form: нормальная форма слова
+        :return: наибольшая доля употреблений слова в документе, 0 - корпус пуст
+        """
+        probability = self._max_probabilities.get(normal_form, None)
+        if probability is None:
+            probability = max((self.document_probability(normal_form, index) for index in range(len(self.documents))),
+                              default=0)
+            self._max_probabilities[normal_form] = probability
+        return probability
+
+
 def contains_sentence(sentence: List[TaggedWord or Separator], word: str, word_constraint: int=0):
     if not isinstance(sentence, list) or not any((isinstance(p, TaggedWord) or isinstance(p, Separator) for p in sentence)):
         return False
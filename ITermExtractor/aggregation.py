@@ -0,0 +1,115 @@
+import heapq
+import logging
+import os
+import pickle
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Iterator, Iterable, Tuple
+
+from ITermExtractor.Structures.WordStructures import Collocation
+
+
+class CandidateAggregator(object):
+    """
+    Агрегатор терминологических кандидатов с ограничением по памяти.
+    Одинаковые словоформы суммируются в памяти; когда число записей превышает лимит,
+    записи, отсортированные по псевдонормальной форме, сбрасываются во временный файл.
+    Группы словоформ выдаются k-путевым слиянием сброшенных файлов и остатка в памяти
+    """
+
+    def __init__(self, memory_limit: int = 0, directory: str = None):
+        """
+        :param memory_limit: максимальное число записей (словоформ) в памяти, 0 - без ограничений
+        :param directory: каталог для временных файлов, по умолчанию системный
+        """
+        if not isinstance(memory_limit, int) or memory_limit < 0:
+            raise ValueError("Недопустимое значение лимита памяти")
+        self.memory_limit = memory_limit
+        self.directory = directory
+        self._entries = dict()  # (псевдонормальная форма, словоформа) -> [порядок, длина, частота, записей]
+        self._runs = []
+        self._order = 0
+        self.records = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, candidates: Iterable[Collocation], multiplicity: int = 1):
+        """
+        Добавляет кандидатов, извлеченных из одного предложения
+        :param candidates: терминологические кандидаты
+        :param multiplicity: сколько раз предложение встретилось в тексте
+        """
+        for candidate in candidates:
+            key = (candidate.pnormal_form, candidate.collocation)
+            entry = self._entries.get(key, None)
+            if entry is None:
+                self._entries[key] = [self._order, candidate.wordcount, candidate.freq * multiplicity, multiplicity]
+                self._order += 1
+            else:
+                entry[2] += candidate.freq * multiplicity
+                entry[3] += multiplicity
+            self.records += multiplicity
+        if 0 < self.memory_limit < len(self._entries):
+            self._spill()
+
+    def _sorted_entries(self) -> List[tuple]:
+        entries = [(pnormal_form, order, collocation, wordcount, freq, records)
+                   for (pnormal_form, collocation), (order, wordcount, freq, records) in self._entries.items()]
+        entries.sort(key=itemgetter(0, 1))
+        return entries
+
+    def _spill(self):
+        descriptor, filename = tempfile.mkstemp(prefix='candidates-', suffix='.run', dir=self.directory)
+        with os.fdopen(descriptor, 'wb') as fp:
+            pickler = pickle.Pickler(fp, pickle.HIGHEST_PROTOCOL)
+            for entry in self._sorted_entries():
+                pickler.dump(entry)
+        logging.debug("Сброшено во временный файл {0} записей ({1})".format(len(self._entries), filename))
+        self._runs.append(filename)
+        self._entries = dict()
+
+    @staticmethod
+    def _read_run(filename: str) -> Iterator[tuple]:
+        with open(filename, 'rb') as fp:
+            unpickler = pickle.Unpickler(fp)
+            while True:
+                try:
+                    yield unpickler.load()
+                except EOFError:
+                    break
+
+    def groups(self) -> Iterator[Tuple[str, List[Collocation], int]]:
+        """
+        Выдает группы словоформ в порядке возрастания псевдонормальной формы,
+        словоформы внутри группы - в порядке первого появления
+        :return: (псевдонормальная форма, словоформы, количество исходных записей)
+        """
+        sources = [self._read_run(filename) for filename in self._runs] + [iter(self._sorted_entries())]
+        merged = heapq.merge(*sources, key=itemgetter(0, 1))
+        for pnormal_form, entries in groupby(merged, key=itemgetter(0)):
+            variants = dict()
+            records = 0
+            for _, order, collocation, wordcount, freq, entry_records in entries:
+                variant = variants.get(collocation, None)
+                if variant is None:
+                    variants[collocation] = Collocation(collocation=collocation, wordcount=wordcount, freq=freq,
+                                                        pnormal_form=pnormal_form)
+                else:
+                    variant.freq += freq
+                records += entry_records
+            yield pnormal_form, list(variants.values()), records
+
+    def close(self):
+        """
+        Удаляет временные файлы
+        """
+        for filename in self._runs:
+            if os.path.exists(filename):
+                os.remove(filename)
+        self._runs = []
+        self._entries = dict()
@@ -0,0 +1,111 @@
+import logging
+import pickle
+from operator import itemgetter
+from typing import List
+
+from ITermExtractor.Structures.WordStructures import Collocation, TaggedWord, Lexicon
+from ITermExtractor.linguistic_filter import LinguisticFilter, prepare_text, merge_variants
+from ITermExtractor.Structures.Subgrams import make_subkeys
+
+
+class CandidateStore(object):
+    """
+    Накопительный перечень терминологических кандидатов.
+    Новые документы добавляются к уже обработанным: пересчитываются только частоты, словоформы и ссылки
+    тех кандидатов, что встретились в новом тексте, поэтому время добавления пропорционально объему нового текста.
+    Перечень сохраняется между запусками (pickle)
+    """
+
+    def __init__(self, linguistic_filter: LinguisticFilter):
+        if not isinstance(linguistic_filter, LinguisticFilter):
+            raise TypeError("Требуется лингвистический фильтр")
+        self.linguistic_filter = linguistic_filter
+        self.lexicon = Lexicon()
+        self._variants = dict()  # псевдонормальная форма -> {словоформа: частота}
+        self._records = dict()  # псевдонормальная форма -> количество исходных записей
+        self._candidates = dict()  # псевдонормальная форма -> кандидат
+        self._containers = dict()  # псевдонормальная форма -> более длинные кандидаты, содержащие ее
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def __contains__(self, pnormal_form: str):
+        return pnormal_form in self._candidates
+
+    def get(self, pnormal_form: str) -> Collocation:
+        return self._candidates.get(pnormal_form, None)
+
+    def append(self, sentences: List[List[TaggedWord]]) -> List[Collocation]:
+        """
+        Добавляет в перечень кандидатов, извлеченных из новых предложений
+        :param sentences: размеченные предложения нового документа
+        :return: кандидаты, затронутые добавлением
+        """
+        if not isinstance(sentences, list):
+            raise TypeError('Необходим список предложений')
+        self.lexicon.add_sentences(sentences)
+
+        touched = dict()
+        for runs, count in prepare_text(sentences):
+            for candidate in self.linguistic_filter.filter_runs(runs):
+                key = candidate.pnormal_form
+                variants = self._variants.setdefault(key, dict())
+                variants[candidate.collocation] = variants.get(candidate.collocation, 0) + candidate.freq * count
+                self._records[key] = self._records.get(key, 0) + count
+                touched[key] = True
+
+        new_keys = [key for key in touched if key not in self._candidates]
+        for key in touched:
+            self._merge(key)
+        for key in new_keys:
+            self._link(key)
+        logging.info("Добавлено предложений: {0}, затронуто кандидатов: {1} (новых {2}), всего {3}"
+                     .format(len(sentences), len(touched), len(new_keys), len(self._candidates)))
+        return [self._candidates[key] for key in touched]
+
+    def _merge(self, key: str):
+        c_vars = [Collocation(collocation=collocation, wordcount=len(collocation.split(' ')), freq=freq,
+                              pnormal_form=key)
+                  for collocation, freq in self._variants[key].items()]
+        merged = merge_variants(self.lexicon, key, c_vars, self._records[key])
+        existing = self._candidates.get(key, None)
+        if existing is None:
+            merged.id = self._next_id
+            merged.llinked = list()
+            self._next_id += 1
+        else:
+            merged.id = existing.id
+            merged.llinked = existing.llinked
+        self._candidates[key] = merged
+
+    def _link(self, key: str):
+        """
+        Расставляет ссылки для нового кандидата: на содержащие его более длинные кандидаты
+        и от содержащихся в нем более коротких кандидатов
+        """
+        candidate = self._candidates[key]
+        candidate.llinked = [self._candidates[container].id for container in self._containers.get(key, list())]
+        for sub_key in make_subkeys(key):
+            self._containers.setdefault(sub_key, list()).append(key)
+            nested = self._candidates.get(sub_key, None)
+            if nested is not None:
+                nested.llinked.append(candidate.id)
+
+    def candidates(self) -> List[Collocation]:
+        """
+        :return: перечень кандидатов, отсортированный по длине словосочетания (как у LinguisticFilter.filter_text)
+        """
+        return sorted(self._candidates.values(), key=itemgetter('wordcount'), reverse=True)
+
+    def save(self, filename: str):
+        with open(filename, 'wb') as fp:
+            pickle.dump(self, fp, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filename: str) -> 'CandidateStore':
+        with open(filename, 'rb') as fp:
+            store = pickle.load(fp)
+        if not isinstance(store, CandidateStore):
+            raise TypeError("Файл не содержит перечня кандидатов")
+        return store
@@ -0,0 +1,173 @@
+"""
+Общий пул процессов на весь запуск. Пул запускается один раз (main.py - при старте, иначе - при первом
+обращении), все этапы отправляют в него задачи вместо создания собственных пулов,
+поэтому модули и анализатор pymorphy2 импортируются процессами однажды.
+Большие массивы передаются процессам через разделяемую память (SharedArrays): задачи несут лишь их имена
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+from multiprocessing import shared_memory, resource_tracker
+from typing import Tuple, List, Sequence, Iterable, Callable
+
+import numpy as np
+
+PROCESSES = 0  # размер пула, 0 - по числу процессоров
+CHUNKS_PER_PROCESS = 4  # задач на процесс: освободившиеся процессы забирают оставшиеся задачи из общей очереди
+MIN_TASK_COST = 80  # наименьшая стоимость задачи, мелкие объемы работ не дробятся
+__pool__ = None
+__attached__ = dict()  # имя блока разделяемой памяти -> (блок, массив), подключенные в процессе-исполнителе
+
+
+def get_pool_size(processes: int = 0) -> int:
+    """
+    :param processes: требуемый размер пула, 0 - из настройки PROCESSES или по числу процессоров
+    :return: размер пула
+    """
+    if processes > 0:
+        return processes
+    if PROCESSES > 0:
+        return PROCESSES
+    return os.cpu_count() or 1
+
+
+def start(processes: int = 0) -> multiprocessing.Pool:
+    """
+    Запускает общий пул процессов, если он еще не запущен
+    :param processes: размер пула, см. get_pool_size()
+    :return: пул процессов
+    """
+    global __pool__
+    if __pool__ is None:
+        size = get_pool_size(processes)
+        # процессы пула должны наследовать трекер ресурсов основного процесса: иначе каждый заводит свой
+        # и при завершении пытается удалить уже освобожденную разделяемую память
+        resource_tracker.ensure_running()
+        __pool__ = multiprocessing.Pool(processes=size)
+        atexit.register(shutdown)
+        logging.info("Запущен пул из {0} процессов".format(size))
+    return __pool__
+
+
+def get_pool() -> multiprocessing.Pool:
+    """
+    :return: общий пул процессов (запускается при первом обращении)
+    """
+    return start()
+
+
+def shutdown():
+    """
+    Дожидается завершения задач и останавливает общий пул процессов
+    """
+    global __pool__
+    if __pool__ is not None:
+        __pool__.close()
+        __pool__.join()
+        __pool__ = None
+        logging.info("Пул процессов остановлен")
+
+
+def split_by_cost(costs: Sequence[float], parts: int = 0, min_cost: float = MIN_TASK_COST) -> List[range]:
+    """
+    Делит элементы на непрерывные диапазоны примерно равной суммарной стоимости. Диапазоны покрывают все элементы
+    :param costs: оценка стоимости каждого элемента (число ссылок кандидата, число слов и т.п.)
+    :param parts: желаемое число диапазонов, 0 - размер пула * CHUNKS_PER_PROCESS
+    :param min_cost: наименьшая стоимость диапазона
+    :return: диапазоны индексов
+
+    >>> split_by_cost([1, 1, 1, 1, 4], 2, 0)
+    [range(0, 4), range(4, 5)]
+    >>> split_by_cost([1] * 10, 3, 0)
+    [range(0, 4), range(4, 7), range(7, 10)]
+    >>> split_by_cost([1] * 10, 8, 5)
+    [range(0, 5), range(5, 10)]
+    """
+    if len(costs) == 0:
+        return []
+    cumulative = np.cumsum(np.asarray(costs, dtype=np.float64))
+    total = float(cumulative[-1])
+    parts = parts if parts > 0 else get_pool_size() * CHUNKS_PER_PROCESS
+    if min_cost > 0:
+        parts = min(parts, max(int(total // min_cost), 1))
+    parts = max(min(parts, len(costs)), 1)
+    # граница i-го диапазона - первый элемент, на котором накопленная стоимость достигает i / parts от общей
+    bounds = np.searchsorted(cumulative, total * np.arange(1, parts) / parts, side='left') + 1
+    bounds = np.unique(np.concatenate(([0], bounds, [len(costs)])))
+    return [range(start, stop) for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+
+def starmap(function: Callable, args: Iterable[tuple]) -> list:
+    """
+    Выполняет задачи в общем пуле. Задачи выдаются процессам по одной, поэтому освободившийся процесс
+    сразу забирает следующую, и неравные по времени задачи не простаивают за самой долгой
+    :param function: функция задачи (уровня модуля)
+    :param args: аргументы задач
+    :return: результаты в порядке задач
+    """
+    return get_pool().starmap(function, args, chunksize=1)
+
+
+class SharedArrays(object):
+    """
+    Массивы NumPy в разделяемой памяти. Создаются в основном процессе; при передаче в задачу
+    сериализуются лишь имена блоков, формы и типы, процесс-исполнитель подключается к блокам без копирования
+    """
+
+    def __init__(self, arrays: Tuple[np.ndarray, ...]):
+        self.specs = []
+        self._blocks = []
+        for array in arrays:
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.specs.append((block.name, array.shape, array.dtype.str))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        return {'specs': self.specs}
+
+    def __setstate__(self, state):
+        self.specs = state['specs']
+        self._blocks = []
+
+    def arrays(self) -> Tuple[np.ndarray, ...]:
+        """
+        :return: массивы (в процессе-исполнителе - подключенные к разделяемой памяти, подключение кэшируется)
+        """
+        if len(self._blocks) != 0:
+            return tuple(np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                         for block, (name, shape, dtype) in zip(self._blocks, self.specs))
+        names = [name for name, shape, dtype in self.specs]
+        if any(name not in __attached__ for name in names):
+            detach()
+            for name, shape, dtype in self.specs:
+                block = shared_memory.SharedMemory(name=name)
+                __attached__[name] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+        return tuple(__attached__[name][1] for name in names)
+
+    def close(self):
+        """
+        Освобождает разделяемую память (в основном процессе, после выполнения всех задач)
+        """
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def detach():
+    """
+    Отключает процесс-исполнитель от ранее переданных массивов
+    """
+    for name in list(__attached__):
+        block, array = __attached__.pop(name)
+        del array
+        block.close()
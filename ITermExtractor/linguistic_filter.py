@@ -1,19 +1,23 @@
 import math
+import itertools
 import helpers
 import ITermExtractor.Morph as m
-import multiprocessing
 import logging
 import copy
 
 from ITermExtractor.Structures.Case import Case
 from ITermExtractor.Structures.PartOfSpeech import PartOfSpeech
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterable
 from operator import itemgetter
-from ITermExtractor.Structures.WordStructures import Collocation, TaggedWord, Separator
-from itertools import groupby
+from ITermExtractor.Structures.WordStructures import (Collocation, TaggedWord, Separator, SentenceRun, Lexicon,
+                                                      DuplicateStatistics)
+from ITermExtractor.aggregation import CandidateAggregator
+from ITermExtractor.Structures.ContextIndex import ContextIndex
+from ITermExtractor.Structures.Subgrams import make_subgrams
 # from Tests.linguistic_filter import is_integral
 
-LIMIT_PER_PROCESS = 80
+CONCATENATE_BATCH_SIZE = 50000  # сколько групп словоформ соединяется за один пакет
+
 # TODO общие структуры вынести в отдельный модуль
 
 
@@ -26,11 +30,20 @@ class LinguisticFilter(object):
 
     _limit = 5; """Магическое значение максимальной длины термина, выраженной в количестве слов"""
 
-    def filter_text(self, sentences: List[List[TaggedWord]], is_single_threaded: bool = False) -> List[Collocation]:
+    def filter_text(self, sentences: List[List[TaggedWord]], is_single_threaded: bool = False,
+                    prepared_text: List[Tuple[List[SentenceRun], int]] = None, lexicon: Lexicon = None,
+                    memory_limit: int = 0, context: ContextIndex = None) -> List[Collocation]:
         """
         Извлечение терминологических кандидатов из текста, разбитого на предложения
         :param sentences: предложения
         :param is_single_threaded: флаг, True - выполнять в одном потоке
+        :param prepared_text: результат prepare_text(sentences), если уже подготовлен другим фильтром:
+         пары (отрезки предложения, число его повторов в тексте). Повторяющиеся предложения в нем уже объединены,
+         частоты их кандидатов умножаются на число повторов
+        :param lexicon: словарь нормальных форм корпуса, если уже построен
+        :param memory_limit: максимальное число словоформ, агрегируемых в памяти до сброса на диск,
+         и число групп в пакете при соединении словоформ, 0 - без ограничений
+        :param context: индекс контекстных слов, заполняемый в том же проходе (для NC-value)
         :return: словарь терминологических кандидатов с количеством встречаемости
         """
         if not isinstance(sentences, list):
@@ -41,27 +54,22 @@ class LinguisticFilter(object):
         logger.info("Фильтрация фильтром {0}".format(str(type(self))))
         logger.info("Всего предложений {0}".format(len(sentences)))
 
-        candidate_terms = list()
-        for sentence in sentences:
-            candidate_terms = candidate_terms + self.filter(sentence=sentence)
-        logger.info("Предложения обработаны, переходим к соединению одинаковых ключей")
-
-        cache = []
-        for s in sentences:
-            for sentence_part in s:
-                if isinstance(sentence_part, Separator) or sentence_part is None:
-                    continue
-                word = sentence_part
-                case = Case.nominative if word.pos in [PartOfSpeech.noun, PartOfSpeech.adjective] else word.case
-                normal_word = TaggedWord(word=word.normalized, pos=word.pos, case=case, normalized=word.normalized)
-                cache.append(normal_word) # `"большой" - потерялись теги
-        tag_cache = dict([(c.normalized, c) for c in cache])
-
-        prev_length = len(candidate_terms)
-        logger.info("Предложения обработаны, соединяем схожие словоформы")
-        candidate_terms = concatenate_similar(tag_cache, candidate_terms)
-        # corrected_candidate_terms = parallel_conjugation(dict(tag_cache), candidate_terms, is_single_threaded)
-        logger.info("Перечень терминологических кандидатов построен (всего {1}/{0})".format(prev_length, len(candidate_terms)))
+        if prepared_text is None:
+            prepared_text = prepare_text(sentences)
+        if lexicon is None:
+            lexicon = Lexicon(sentences)
+        statistics = get_duplicate_statistics([count for runs, count in prepared_text])
+        logger.info("Различных предложений {0} (доля повторов {1:.1%})"
+                    .format(statistics.unique, statistics.duplicate_ratio))
+
+        with CandidateAggregator(memory_limit) as aggregator:
+            for runs, count in prepared_text:
+                aggregator.add(self.filter_runs(runs, context, count), count)
+            logger.info("Предложения обработаны, соединяем схожие словоформы")
+            candidate_terms = concatenate_groups(lexicon, aggregator.groups(), is_single_threaded, memory_limit)
+            # corrected_candidate_terms = parallel_conjugation(dict(tag_cache), candidate_terms, is_single_threaded)
+            logger.info("Перечень терминологических кандидатов построен (всего {1}/{0})"
+                        .format(aggregator.records, len(candidate_terms)))
 
         logger.info("Расставляем ссылки, вложенные термины")
         candidate_terms = define_collocation_links(candidate_terms)
@@ -74,65 +82,52 @@ class LinguisticFilter(object):
         """
         Из входного предложения отсеивает терминологические кандидаты
         :param sentence: предложение/словосочетание, список из кортежей (слово, часть речи)
-        :param append_mode: флаг, показывающий добавлять ли термины в существующий список или нет
         :return: словарь терминологических кандидатов с количеством встречаемости
         """
-        # прогонять по списку токенов, по-элементно прогонять слова из предложения
-        if not isinstance(sentence, list):
-            raise TypeError("Необходим список слов из предложения")
-        if None in sentence:
-            sentence = [p for p in sentence if p is not None]
-        check_list = [isinstance(sentence_part, TaggedWord) or isinstance(sentence_part, Separator)
-                      for sentence_part in sentence]
-        if False in check_list:
-            false_index = check_list.index(False) if False in check_list else 0
-            raise TypeError("Необходим список слов из предложения", len(sentence),
-                            False in check_list, false_index, sentence[false_index], sentence)
-
-        for sentence_part in sentence:  # все некорректные слова выкидываем за борт
-            if isinstance(sentence_part, Separator):
-                continue
-            word = sentence_part
-
-            if not helpers.is_correct_word(word.word) or str.isspace(word.word) or word.word == '':
-                sentence.remove(word)
+        return self.filter_runs(prepare_sentence(sentence))
 
+    def filter_runs(self, runs: List[SentenceRun], context: ContextIndex = None,
+                    multiplicity: int = 1) -> List[Collocation]:
+        """
+        Отсеивает терминологические кандидаты из подготовленных отрезков одного предложения.
+        Окна словосочетаний вырезаются срезами из заранее вычисленных массивов словоформ
+        :param runs: отрезки предложения, полученные prepare_sentence()
+        :param context: индекс, в который записываются соседние слова каждого вхождения кандидата
+        :param multiplicity: сколько раз предложение встретилось в тексте (для счетчиков контекста)
+        :return: словарь терминологических кандидатов с количеством встречаемости
+        """
         candidate_terms = list()
+        known_indices = dict()  # словоформа -> индекс в candidate_terms
 
         min_wlimit = self.pattern.get_col_min_word_limit()
         max_wlimit = self.pattern.get_col_max_word_limit()
         max_wlimit = max_wlimit if max_wlimit <= self._limit else self._limit
-
-        if len(sentence) < min_wlimit:
+        longest_run = max((len(run.words) for run in runs), default=0)
+        if longest_run < min_wlimit:
             return list()
-        if len(sentence) < max_wlimit:
-            max_wlimit = len(sentence)
+        if longest_run < max_wlimit:
+            max_wlimit = longest_run
 
         for word_count in range(max_wlimit, min_wlimit - 1, -1):
-            for i in range(0, len(sentence) - word_count + 1):  # извлечение словосочетаний, длиной от 2 слов и более
-                candidate_term = retrieve_collocation(sentence, i, word_count)
-                if len(candidate_term) < word_count:
-                    continue
-
-                candidate_term_collocation = ' '.join([word[0] for word in candidate_term]).lower()
-                pseudo_normal_form = ' '.join([word.normalized for word in candidate_term]).lower()
-                if candidate_term_collocation.isupper():
-                    candidate_term_collocation = candidate_term_collocation.lower()
-
-                already_existing_indices = [i for i, term in enumerate(candidate_terms)
-                            if term.collocation.lower() == candidate_term_collocation.lower()]
-                is_appended = len(already_existing_indices) >= 1
-                if is_appended:
-                    index = already_existing_indices[0]
-                    candidate_terms[index].add_freq()
-                else:
-                    flag = self.match(candidate_term)
-                    if flag:
+            for run in runs:
+                for i in range(0, len(run.words) - word_count + 1):
+                    candidate_term_collocation = ' '.join(run.forms[i:i + word_count])
+                    index = known_indices.get(candidate_term_collocation)
+                    if index is not None:
+                        candidate_terms[index].add_freq()
+                    elif self.pattern.match_pos(run.pos[i:i + word_count]):
+                        index = len(candidate_terms)
+                        known_indices[candidate_term_collocation] = index
                         candidate_terms.append(Collocation(
                                         collocation=candidate_term_collocation,
-                                        wordcount=len(candidate_term),
+                                        wordcount=word_count,
                                         freq=1,
-                                        pnormal_form=pseudo_normal_form))
+                                        pnormal_form=' '.join(run.normal_forms[i:i + word_count])))
+                    else:
+                        continue
+                    if context is not None:
+                        context.add_occurrence(candidate_terms[index].pnormal_form, run, i, i + word_count,
+                                               multiplicity)
         return candidate_terms
 
     def match(self, phrase):
@@ -188,6 +183,20 @@ class FilterPatternConjuction(object):
         max_word_limit = sum(token.max_count for token in self.pattern)
         return max_word_limit
 
+    def match_pos(self, pos_list: Tuple[PartOfSpeech, ...]) -> bool:
+        """
+        Аналог match(), работающий с заранее извлеченными частями речи словосочетания
+        :param pos_list: части речи слов словосочетания
+        :return: да/нет
+        """
+        if len(pos_list) == 0:
+            return False
+        if not self.__iscomplex__:
+            return self.pattern[0].match_pos(pos_list)
+        if len(self.pattern) == 2:
+            return self.pattern[1].match_pos(pos_list[-1:]) and self.pattern[0].match_pos(pos_list[:-1])
+        return False
+
     def match(self, phrase: List[TaggedWord]) -> bool:
         # проверка с конца, как правило в шаблонах последний токен требует 1 вхождение
         check_flag = False in [isinstance(element, m.TaggedWord) for element in phrase]
@@ -248,6 +257,16 @@ class FilterPatternToken(object):
 
         return pos_flag & count_flag  # , pos_check_list
 
+    def match_pos(self, pos_list: Tuple[PartOfSpeech, ...]) -> bool:
+        """
+        Аналог match(), работающий с заранее извлеченными частями речи
+        :param pos_list: части речи слов словосочетания
+        :return: финальный вердикт
+        """
+        if not self.min_count <= len(pos_list) <= self.max_count:
+            return False
+        return all(self.POS.match(pos) for pos in pos_list)
+
 
 class PartOfSpeechStruct:
     """
@@ -315,161 +334,278 @@ if __name__ == "__main__":
     '''
 
 
-def set_ids(collocations: List[Collocation]) -> List[Collocation]:
-    for collocation in collocations:
-        collocation.id = id(collocation)
+def set_ids(collocations: List[Collocation], start: int = 0) -> List[Collocation]:
+    """
+    Присваивает словосочетаниям плотные последовательные идентификаторы start..start + N - 1
+    в порядке следования в списке. Порядок групп детерминирован (по псевдонормальной форме),
+    поэтому идентификаторы воспроизводятся от запуска к запуску и годятся как индексы массивов
+    :param collocations: словосочетания
+    :param start: первый идентификатор
+    :return: тот же список
+
+    >>> [c.id for c in set_ids([Collocation(collocation='огонь'), Collocation(collocation='огонь артиллерии')])]
+    [0, 1]
+    """
+    for cid, collocation in enumerate(collocations, start):
+        collocation.id = cid
     return collocations
 
 
 def concatenate_similar(word_dict: Dict[str, TaggedWord], collocations: List[Collocation]) -> List[Collocation]:
     """
-    http://stackoverflow.com/a/3749740 - группировка
     Группирует схожие словоформы
     :param word_dict: кэш слов, ранее обработанных pymorphy
     :param collocations: полученные прежде словосочетания
     :return: список словосочетания, соединенных в одну словоформу
     """
-    collocations = set_ids(collocations)
-    grouped_collocations = {}
-    collocations = sorted(collocations, key=itemgetter('pnormal_form'))
-    for key, value_sitter in groupby(collocations, key=itemgetter('pnormal_form')):
-        grouped_collocations[key] = list(value_sitter)
+    return concatenate_groups(word_dict, group_variants(collocations))
+
+
+def group_variants(collocations: Iterable[Collocation]) -> List[Tuple[str, List[Collocation], int]]:
+    """
+    Группирует словоформы одного словосочетания за один проход по хэшу сигнатуры -
+    последовательности нормальных форм слов (то же правило, что в Morph.is_identical_collocation_q)
+    :param collocations: словосочетания, например, извлеченные из отдельных предложений
+    :return: группы (псевдонормальная форма, словоформы, 0) в порядке возрастания псевдонормальной формы,
+     словоформы внутри группы - в порядке появления
+
+    >>> collocations = [Collocation('огня артиллерии', 2, 1, 'огонь артиллерия'), Collocation('огонь', 1, 1, 'огонь'),
+    ...                 Collocation('огонь артиллерии', 2, 1, 'огонь артиллерия')]
+    >>> [(key, [c.collocation for c in c_vars]) for key, c_vars, records in group_variants(collocations)]
+    [('огонь', ['огонь']), ('огонь артиллерия', ['огня артиллерии', 'огонь артиллерии'])]
+    """
+    groups = dict()
+    for collocation in collocations:
+        key = collocation.pnormal_form
+        if key == str():
+            key = ' '.join(m.get_signature(m.tag_collocation(collocation.collocation)))
+            collocation.pnormal_form = key
+        groups.setdefault(key, list()).append(collocation)
+    return [(key, groups[key], 0) for key in sorted(groups)]
 
+
+def concatenate_groups(word_dict: Dict[str, TaggedWord], groups: Iterable[Tuple[str, List[Collocation], int]],
+                       is_single_threaded: bool = False, batch_size: int = 0) -> List[Collocation]:
+    """
+    Соединяет словоформы в уже сгруппированных по псевдонормальной форме словосочетаниях.
+    Группы читаются пакетами, нормальные формы групп пакета находятся вместе; в памяти одновременно
+    хранится только текущий пакет групп и уже соединенные кандидаты
+    :param word_dict: кэш слов, ранее обработанных pymorphy
+    :param groups: группы (псевдонормальная форма, словоформы, количество исходных записей),
+     например, из CandidateAggregator.groups()
+    :param is_single_threaded: флаг, True - выполнять в одном потоке
+    :param batch_size: количество групп в пакете, 0 - CONCATENATE_BATCH_SIZE
+    :return: список словосочетания, соединенных в одну словоформу
+    """
+    batch_size = batch_size if batch_size > 0 else CONCATENATE_BATCH_SIZE
+    groups = iter(groups)
     final_list = []
-    for key, c_vars in grouped_collocations.items():
-        index = 0
-        if len(c_vars) > 1:
-            tagged_pnormal_collocation = [word_dict.get(word, word) for word in key.split(' ')]
-            if len(tagged_pnormal_collocation) == 1:
-                c_vars[index].collocation = c_vars[index].pnormal_form
-            elif len(tagged_pnormal_collocation) == 2:
-                variant = m.get_biword_coll_normal_form(tagged_pnormal_collocation)
-                c_vars[index].collocation = variant
-            elif len(tagged_pnormal_collocation) > 2:  # TODO добавить +1 слово, где главное заменено на норм форму
+    batch = list(itertools.islice(groups, batch_size))
+    while len(batch) > 0:
+        final_list.extend(set_ids(concatenate_batch(word_dict, batch, is_single_threaded), len(final_list)))
+        batch = list(itertools.islice(groups, batch_size))
+    return final_list
+
+
+def concatenate_batch(word_dict: Dict[str, TaggedWord], groups: List[Tuple[str, List[Collocation], int]],
+                      is_single_threaded: bool = False) -> List[Collocation]:
+    """
+    Соединяет словоформы в пакете групп, нормальные формы всех групп пакета находятся одним вызовом
+    :param word_dict: кэш слов, ранее обработанных pymorphy
+    :param groups: группы (псевдонормальная форма, словоформы, количество исходных записей)
+    :param is_single_threaded: флаг, True - выполнять в одном потоке
+    :return: соединенные словосочетания в порядке групп
+    """
+    indices = [i for i, (key, c_vars, records) in enumerate(groups)
+               if (records if records > 0 else len(c_vars)) > 1 and ' ' in key]
+    normal_forms = m.get_normal_forms([[word_dict.get(word, word) for word in groups[i][0].split(' ')] for i in indices],
+                                      [groups[i][1][0].collocation for i in indices], is_single_threaded)
+    normal_forms = dict(zip(indices, normal_forms))
+
+    # без главного слова - выбираем ближайшие к псевдонормальной словоформы, тоже одним пакетом
+    selections = []
+    for i in [i for i in indices if normal_forms[i] == '' and groups[i][0].count(' ') > 1]:
+        key, c_vars, records = groups[i]
+        main_word = m.get_main_word([word_dict.get(word, word) for word in key.split(' ')])
+        selections.append((i, (key, c_vars + [m.replace_main_word(c_vars[0], main_word)], main_word)))
+    indices = m.get_collocation_normal_forms([selection for i, selection in selections], is_single_threaded)
+    for (i, (key, c_vars, main_word)), index in zip(selections, indices):
+        normal_forms[i] = c_vars[index].collocation
+
+    return [merge_variants(word_dict, key, c_vars, records, normal_forms.get(i, None))
+            for i, (key, c_vars, records) in enumerate(groups)]
+
+
+def merge_variants(word_dict: Dict[str, TaggedWord], key: str, c_vars: List[Collocation],
+                   records: int = 0, normal_form: str = None) -> Collocation:
+    """
+    Соединяет словоформы одного словосочетания (с общей псевдонормальной формой) в одного кандидата
+    :param word_dict: кэш слов, ранее обработанных pymorphy
+    :param key: псевдонормальная форма
+    :param c_vars: словоформы
+    :param records: количество исходных записей в группе (одна словоформа могла встретиться в нескольких предложениях),
+     по умолчанию равно числу словоформ
+    :param normal_form: заранее найденная нормальная форма словосочетания
+    :return: кандидат в выбранной словоформе с суммарной частотой
+    """
+    records = records if records > 0 else len(c_vars)
+    index = 0
+    if records > 1:
+        tagged_pnormal_collocation = [word_dict.get(word, word) for word in key.split(' ')]
+        if len(tagged_pnormal_collocation) == 1:
+            c_vars[index].collocation = c_vars[index].pnormal_form
+        elif len(tagged_pnormal_collocation) == 2:
+            variant = normal_form if normal_form is not None else m.get_biword_coll_normal_form(tagged_pnormal_collocation)
+            c_vars[index].collocation = variant
+        elif len(tagged_pnormal_collocation) > 2:
+            if normal_form is None:
+                normal_form = m.get_normal_form(tagged_pnormal_collocation, c_vars[0].collocation)
+            if normal_form != '':
+                c_vars[index].collocation = normal_form
+            else:  # главное слово не найдено - выбираем ближайшую к псевдонормальной словоформу
                 main_word = m.get_main_word(tagged_pnormal_collocation)
                 new_var = m.replace_main_word(c_vars[0], main_word)
                 c_vars.append(new_var)
                 index = m.get_collocation_normal_form(key, c_vars, main_word)
 
-            updated_freq = sum([c.freq for c in c_vars])
-            c_vars[index].freq = updated_freq
-        final_list.append(c_vars[index])
-    return final_list
+        updated_freq = sum([c.freq for c in c_vars])
+        c_vars[index].freq = updated_freq
+    return c_vars[index]
 
 
 # TODO или в отдельный модуль
-def define_collocation_links(collocations: List[Collocation]) -> List[Collocation]:
+def define_collocation_links(collocations: List[Collocation], is_inplace: bool = True) -> List[Collocation]:
     """
-    Определение списка более длинных словосочетаний
+    Определение списка более длинных словосочетаний.
+    Более длинное словосочетание содержит данное, если слова псевдонормальной формы данного
+    идут в нем подряд (сравниваются целые слова, а не подстроки)
     :param collocations: сзвлеченные словосочетания
+    :param is_inplace: флаг, True - ссылки проставляются в самих словосочетаниях,
+     False - в их глубокой копии, исходный список не изменяется
     :return: обновленный список словосочетаний + ссылки
     """
-    grouped_by_len = {}
-    lengths = []
-    cloned = copy.deepcopy(collocations)
-    sorted_collocations = sorted(cloned, key=itemgetter('wordcount'))
-    collocations_dict = dict([(c.id, c) for c in sorted_collocations])
-
-    for key, value_sitter in groupby(sorted_collocations, key=itemgetter('wordcount')):
-        grouped_by_len[key] = list(value_sitter)
-        lengths.append(key)
-
-    lengths = sorted(lengths)
-    for curr_len in lengths:
-        for collocation in list(grouped_by_len[curr_len]):
-            query_key = collocation.pnormal_form
-            containers = []
-            for j in range(curr_len, len(lengths)):  # выборка всех словосочетаний, содержащих query_key
-                containers = containers + [hl_coll for hl_coll in grouped_by_len[lengths[j]]
-                                   if query_key in hl_coll.pnormal_form]
-            collocations_dict[collocation.id].llinked = [c.id for c in containers]  # вот они, ссылки
-    return list(collocations_dict.values())
-
-
-# TODO obsolete
-def parallel_conjugation(word_dict: Dict[str, TaggedWord], candidate_list: List[Collocation],
-                         is_single_threaded: bool = False) -> List[Collocation]:
-    logging.info("Разделяем на потоки")
-    spliced_candidate_list = split_tasks(candidate_list)
-    args = list(zip([word_dict for i in range(len(spliced_candidate_list))], spliced_candidate_list))
-    if not is_single_threaded:
-        logging.debug("Разделили аргументы по задачам ({0})".format(len(args)))
-        with multiprocessing.Pool(processes=len(args)) as pool:
-            result = pool.starmap(conjugate, args)
-        grouped_result = [element for line in result for element in line]
-    else:
-        grouped_result = []
-        for arg in args:
-            grouped_result += conjugate(arg[0], arg[1])
-    logging.debug("Готовы результаты обработки")
-    return grouped_result
-
-# TODO adj-noun фильтр, collocation вперемешку с TaggedWord, как?
-
-
-def conjugate(word_dict: Dict[str, TaggedWord], candidates_list: List[Collocation]) -> List[Collocation]:
-    """
-    Сопоставляет одни и те же словосочетания в разных словоформах и суммирует в итоговом списке терминологических кандидатов их частоты встречаемости
-    :param word_dict: словарь размеченных слов, встреченных в заданном тексте
-    :param candidates_list: список терминологических кандидатов
-    :return: словарь терминологических кандидатов
-    """
-    # TODO соединять ключи словаря, отличающиеся друг от друга склонением и
-    # TODO регистром !!!
-    # TODO желательно приводить в норм форму
-    # todo отсеивать словосочетания со словом в 1 букву
-
-    joined_form_list = []
-    local_sorted_key_list = [([word_dict.get(word, None) for word in term.collocation.split(" ")])
-                             for term in candidates_list]
-
-    # if None in local_sorted_key_list:
-    local_sorted_key_list = list(filter(lambda a: a is not None, local_sorted_key_list))
-
-    for key_tag in local_sorted_key_list:
-        element_matches = m.count_includes(key_tag, local_sorted_key_list)
-        if len(element_matches) == 1:
-            match_index = element_matches[0][0]
-            joined_form_list.append(candidates_list[match_index])
+    if not is_inplace:
+        collocations = copy.deepcopy(collocations)
+    sorted_collocations = sorted(collocations, key=itemgetter('wordcount'))
+    subgram_index = build_subgram_index(sorted_collocations)
+    for collocation in sorted_collocations:
+        query_key = tuple(collocation.pnormal_form.split(' '))
+        collocation.llinked = list(subgram_index.get(query_key, list()))  # вот они, ссылки
+    return sorted_collocations
+
+
+def build_subgram_index(collocations: List[Collocation]) -> Dict[Tuple[str, ...], List[int]]:
+    """
+    Строит индекс: последовательность слов -> id более длинных словосочетаний, в которых она встречается
+    :param collocations: словосочетания, id в списках индекса идут в том же порядке
+    :return: индекс
+    """
+    index = dict()
+    for collocation in collocations:
+        if collocation.wordcount < 2:
+            continue
+        for subgram in make_subgrams(tuple(collocation.pnormal_form.split(' '))):
+            index.setdefault(subgram, []).append(collocation.id)
+    return index
+
+
+def is_run_breaker(word: TaggedWord) -> bool:
+    """
+    Однобуквенные слова (кроме предлогов и союзов) не входят в словосочетания и разрывают их, как разделители
+    :param word: размеченное слово
+    :return: да/нет
+    """
+    return len(word.word) == 1 and word.pos not in [PartOfSpeech.preposition, PartOfSpeech.conjunction]
+
+
+def prepare_sentence(sentence: List[TaggedWord and Separator]) -> List[SentenceRun]:
+    """
+    Однократная подготовка предложения к извлечению словосочетаний:
+    некорректные слова отбрасываются, по разделителям и однобуквенным словам предложение делится на отрезки,
+    для каждого отрезка заранее вычисляются словоформы и нормальные формы в нижнем регистре и части речи
+    :param sentence: предложение с размеченными словами и разделителями
+    :return: список отрезков предложения
+
+    >>> runs = prepare_sentence([TaggedWord(word='Огонь', pos=PartOfSpeech.noun, case=Case.nominative, normalized='огонь'), TaggedWord(word='артиллерии', pos=PartOfSpeech.noun, case=Case.genitive, normalized='артиллерия'), Separator(symbol=','), TaggedWord(word='минометы', pos=PartOfSpeech.noun, case=Case.nominative, normalized='миномёт')])
+    >>> [run.forms for run in runs]
+    [('огонь', 'артиллерии'), ('минометы',)]
+    """
+    if not isinstance(sentence, list):
+        raise TypeError("Необходим список слов из предложения")
+    runs = []
+    words = []
+    for index, sentence_part in enumerate(sentence):
+        if sentence_part is None:
+            continue
+        if isinstance(sentence_part, Separator):
+            is_breaker = True
+        elif isinstance(sentence_part, TaggedWord):
+            word = sentence_part.word
+            if not helpers.is_correct_word(word) or str.isspace(word) or word == '':  # некорректные слова выкидываем за борт
+                continue
+            is_breaker = is_run_breaker(sentence_part)
         else:
-            normal_form_local_index = m.get_collocation_normal_form([element[1] for element in element_matches])
-            if normal_form_local_index != -1:
-                base_index = element_matches[normal_form_local_index][0]
-            else:
-                base_index = element_matches[0][0]
-
-            base_key = local_sorted_key_list[base_index]
-            if base_key not in joined_form_list:
-                if None in base_key:
-                    continue
-                remaining_keys = [element[0] for element in element_matches
-                                  if element[0] != base_index]
-                col = ' '.join([key.word for key in base_key])
-                summary_freq = sum(candidates_list[key].freq for key in remaining_keys)
-                wordcount = len(key_tag)
-                joined_form_list.append(Collocation(collocation=col, wordcount=wordcount, freq=summary_freq))
-
-        for i, lst in reversed(element_matches):
-            del local_sorted_key_list[i]
-    return joined_form_list
-
-
-def split_tasks(task_list: List[Collocation]):
-    """
-    Разделяет список на несколько для равномерного разделения процессов на параллельные потоки
-    :param task_list: входной список
-    :return: разделенный список
-    """
-    sorted_list = sorted(task_list, key=itemgetter(1, 0))
-    length = len(sorted_list)
-    threads = 1
-    if length > LIMIT_PER_PROCESS:
-        threads = int(length / 80) + 1
-    if threads == 1:
-        split_list = [sorted_list]
-    else:
-        split_list = [sorted_list[LIMIT_PER_PROCESS * i:LIMIT_PER_PROCESS * (i + 1)] for i in range(threads)]
-    return split_list
+            raise TypeError("Необходим список слов из предложения", index, sentence_part)
+
+        if not is_breaker:
+            words.append(sentence_part)
+        elif len(words) != 0:
+            runs.append(make_run(words))
+            words = []
+    if len(words) != 0:
+        runs.append(make_run(words))
+    return runs
+
+
+def make_run(words: List[TaggedWord]) -> SentenceRun:
+    return SentenceRun(words=tuple(words),
+                       forms=tuple(word.word.lower() for word in words),
+                       normal_forms=tuple(word.normalized.lower() for word in words),
+                       pos=tuple(word.pos for word in words))
+
+
+def prepare_text(sentences: List[List[TaggedWord and Separator]]) -> List[Tuple[List[SentenceRun], int]]:
+    """
+    Подготовка всех предложений текста, см. prepare_sentence().
+    Повторяющиеся предложения (шапки, подписи, типовые приказы) готовятся один раз
+    :param sentences: предложения
+    :return: список отрезков для каждого различного предложения и число его повторов в тексте
+    """
+    return [(prepare_sentence(sentence), count) for sentence, count in count_sentences(sentences)]
+
+
+def count_sentences(sentences: List[List[TaggedWord and Separator]]) -> List[Tuple[List[TaggedWord and Separator], int]]:
+    """
+    Объединяет одинаковые размеченные предложения
+    :param sentences: предложения
+    :return: различные предложения в порядке первого появления и число их повторов
+
+    >>> sentence = [TaggedWord(word='Утверждаю', pos=PartOfSpeech.verb, case=Case.none, normalized='утверждать')]
+    >>> [(len(s), count) for s, count in count_sentences([sentence, [Separator(symbol=',')], list(sentence)])]
+    [(1, 2), (1, 1)]
+    """
+    counts = dict()
+    unique_sentences = []
+    for sentence in sentences:
+        key = tuple(sentence)
+        count = counts.get(key, 0)
+        if count == 0:
+            unique_sentences.append((key, sentence))
+        counts[key] = count + 1
+    return [(sentence, counts[key]) for key, sentence in unique_sentences]
+
+
+def get_duplicate_statistics(counts: List[int]) -> DuplicateStatistics:
+    """
+    :param counts: число повторов каждого различного предложения
+    :return: статистика повторов
+
+    >>> get_duplicate_statistics([3, 1])
+    DuplicateStatistics(sentences=4, unique=2, duplicate_ratio=0.5)
+    """
+    total = sum(counts)
+    return DuplicateStatistics(sentences=total, unique=len(counts),
+                               duplicate_ratio=1 - len(counts) / total if total > 0 else 0.0)
 
 
 def retrieve_collocation(sentence: List[TaggedWord and Separator], start_index: int, collocation_length: int) -> List[TaggedWord]:
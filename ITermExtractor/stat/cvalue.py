@@ -1,14 +1,18 @@
 import math
 import logging
-import multiprocessing
 from collections import namedtuple
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Tuple
 from operator import itemgetter
+
+import numpy as np
+
 from ITermExtractor.Structures.WordStructures import Collocation
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from ITermExtractor import executor
+from ITermExtractor.executor import SharedArrays
+from ITermExtractor.Structures.Subgrams import make_subkeys
 from itertools import groupby
-from helpers import split_tasks
-from ITermExtractor.Morph import find_candidate_by_id
-from Tests.linguistic_filter import is_integral
+from helpers import select_top
 
 params = namedtuple('params', ['name', 'cvalue'])
 params.__doc__ = "Параметры терминологических подстрок"
@@ -25,86 +29,306 @@ def set_threshold(value: float):
 # </editor-fold>
 
 
-def calculate(candidates: List[Collocation], is_single_threaded: bool = False) -> List[params]:
+def calculate(candidates: List[Collocation], is_single_threaded: bool = False,
+              graph: CandidateGraph = None, top_k: int = 0, threshold: float = None) -> List[params]:
     """
     Подсчитывает c-value для списка терминологических кандидатов
     :param is_single_threaded: флаг многопочности - True = выполнять в одном потоке, False - в нескольких
     :param candidates: список терминологических кандидатов  collocation_tuple('словосочетание', 'число слов', 'частота')
+    :param graph: граф вложенности тех же кандидатов, если уже построен
+    :param top_k: сколько лучших терминов вернуть, 0 - все
+    :param threshold: порог c-value, по умолчанию THRESHOLD
     :return: список терминов со значениями c-value
     """
+    groups = calculate_by_length(candidates, is_single_threaded, graph, top_k, threshold)
+    terms = select_top((term for wordcount, group in groups for term in group), top_k, key=itemgetter(1))
+    logging.info("Подсчет cvalue закончен, терминов: {0}".format(len(terms)))
+    return terms
 
-    terms = []
-    candidates = sorted(candidates, key=itemgetter('wordcount'), reverse=True)
+
+def calculate_by_length(candidates: List[Collocation], is_single_threaded: bool = False,
+                        graph: CandidateGraph = None, top_k: int = 0,
+                        threshold: float = None) -> Iterator[Tuple[int, List[params]]]:
+    """
+    Подсчитывает c-value по группам кандидатов одной длины, от длинных к коротким.
+    Группа выдается сразу после подсчета, поэтому первые результаты можно сохранять до окончания работы
+    :param candidates: список терминологических кандидатов
+    :param is_single_threaded: флаг многопочности - True = выполнять в одном потоке, False - в нескольких
+    :param graph: граф вложенности тех же кандидатов, если уже построен
+    :param top_k: сколько лучших терминов оставить в каждой группе, 0 - все
+    :param threshold: порог c-value, по умолчанию THRESHOLD
+    :return: (длина, термины группы по убыванию c-value)
+    """
+    if graph is None:
+        graph = CandidateGraph(candidates)
+    threshold = THRESHOLD if threshold is None else threshold
+    order = np.argsort(-graph.wordcount, kind='stable')  # позиции кандидатов по убыванию длины
+    # кандидаты, не достигающие порога даже без вычета частот содержащих их фраз, отбрасываются до разбора ссылок
+    total = len(order)
+    order = order[get_upper_bounds(graph.freq, graph.wordcount)[order] > threshold]
+    logging.info("Отброшено кандидатов ниже порога {0}: {1} из {2}".format(threshold, total - len(order), total))
     grouped_by_len = dict()
-    candidate_lengths = []
 
-    for key, value_sitter in groupby(candidates, key=itemgetter('wordcount')):
-        grouped_by_len[key] = list(value_sitter)
-        candidate_lengths.append(key)
+    start = 0
+    for key, value_sitter in groupby(graph.wordcount[order].tolist()):
+        stop = start + len(list(value_sitter))
+        grouped_by_len[key] = range(start, stop)
+        start = stop
 
     lengths_info = " ".join(["{1} фраз ({0} сл.)".format(k, len(v)) for k, v in grouped_by_len.items()])
     logging.info("Предварительные операции проведены, всего словосочетаний: {0}: {1}"
-                 .format(len(candidates), lengths_info))
+                 .format(len(order), lengths_info))
+
+    shared = None
+    if not is_single_threaded:
+        # таблица кандидатов публикуется в разделяемой памяти один раз; задачи - лишь диапазоны индексов
+        shared = SharedArrays(graph.arrays() + (order,))
+    try:
+        for index, c_group in grouped_by_len.items():
+            terms = select_top(parallel_conjugation(c_group, graph, order, shared, threshold), top_k, key=itemgetter(1))
+            logging.info("Кандидаты длиной {0} сл. обработаны".format(index))
+            yield index, terms
+    finally:
+        if shared is not None:
+            shared.close()
 
-    for index, c_group in grouped_by_len.items():
-        terms += parallel_conjugation(c_group, candidates, is_single_threaded)
-        logging.info("Кандидаты длиной {0} сл. обработаны".format(index))
 
-    logging.info("Подсчет cvalue закончен (терминов: {0}), сортировка и выход".format(len(terms)))
-    terms = sorted(terms, key=itemgetter(1), reverse=True)
-    return terms
+def calculate_vectorized(candidates: List[Collocation], graph: CandidateGraph = None,
+                         threshold: float = None) -> List[params]:
+    """
+    Векторный подсчет c-value всех кандидатов сразу по массивам графа вложенности:
+    частоты содержащих кандидатов суммируются по сегментам ссылок, порог применяется маской,
+    результат упорядочивается argsort (как и calculate - по убыванию c-value, при равенстве - по убыванию длины)
+    :param candidates: список терминологических кандидатов
+    :param graph: граф вложенности тех же кандидатов, если уже построен
+    :param threshold: порог c-value, по умолчанию THRESHOLD
+    :return: список терминов со значениями c-value
+    """
+    if graph is None:
+        graph = CandidateGraph(candidates)
+    threshold = THRESHOLD if threshold is None else threshold
+    if len(graph) == 0:
+        return []
+    offsets, targets, freq, wordcount = graph.arrays()
 
+    link_counts = np.diff(offsets)
+    sources = np.repeat(np.arange(len(graph)), link_counts)  # номер строки CSR для каждой ссылки
+    longer_phrase_freq = np.bincount(sources, weights=freq[np.maximum(targets, 0)], minlength=len(graph))
+    is_broken = np.bincount(sources, weights=targets < 0, minlength=len(graph)) > 0
+    log_table = get_log_table(wordcount)
 
-def calculate_by_group(c_group: List[Collocation], candidates: List[Collocation]) -> List[params]:
+    is_nested = link_counts > 0
+    cvalues = np.where(is_nested,
+                       freq - 1 / np.maximum(link_counts, 1) * longer_phrase_freq,
+                       freq) * log_table[wordcount]
+
+    for position in np.flatnonzero(is_broken):
+        logging.error("В ссылках фразы \"{0}\" закралась ссылка (x{1}) на несуществующий id"
+                      .format(graph.names[position], int((graph.links(position) < 0).sum())))
+    order = np.argsort(-wordcount, kind='stable')
+    order = order[(cvalues[order] > threshold) & ~is_broken[order]]
+    order = order[np.argsort(-cvalues[order], kind='stable')]
+    names = graph.names
+    return [params(name=names[position], cvalue=cvalue) for position, cvalue in zip(order.tolist(),
+                                                                                   cvalues[order].tolist())]
+
+
+class CValueIndex(object):
+    """
+    Инкрементный индекс c-value. Для каждого кандидата хранятся частота, число содержащих его кандидатов
+    и сумма их частот; при поступлении новых частот пересчитываются только изменившиеся кандидаты
+    и вложенные в них более короткие. Упорядоченный перечень терминов доступен в любой момент
+    """
+
+    def __init__(self):
+        self._entries = dict()  # псевдонормальная форма -> [словоформа, длина, частота, содержащих, их частот, c-value]
+        self._containers = dict()  # псевдонормальная форма -> более длинные кандидаты индекса, содержащие ее
+        self._ranked = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, pnormal_form: str):
+        return pnormal_form in self._entries
+
+    def update(self, candidates: Iterable[Collocation]) -> int:
+        """
+        Учитывает новые частоты кандидатов (например, возвращенные CandidateStore.append)
+        :param candidates: новые или изменившиеся кандидаты с полной (а не добавленной) частотой
+        :return: количество пересчитанных кандидатов
+        """
+        affected = dict()
+        for candidate in candidates:
+            key = candidate.pnormal_form
+            sub_keys = [sub_key for sub_key in make_subkeys(key) if sub_key in self._entries]
+            entry = self._entries.get(key, None)
+            if entry is None:
+                containers = self._containers.get(key, list())
+                entry = [candidate.collocation, candidate.wordcount, 0, len(containers),
+                         sum(self._entries[container][2] for container in containers), 0]
+                self._entries[key] = entry
+                for sub_key in make_subkeys(key):
+                    self._containers.setdefault(sub_key, list()).append(key)
+                for sub_key in sub_keys:
+                    self._entries[sub_key][3] += 1
+            delta = candidate.freq - entry[2]
+            entry[0] = candidate.collocation
+            entry[2] = candidate.freq
+            for sub_key in sub_keys:
+                self._entries[sub_key][4] += delta
+                affected[sub_key] = True
+            affected[key] = True
+
+        for key in affected:
+            entry = self._entries[key]
+            entry[5] = get_cvalue(entry[1], entry[2], entry[3], entry[4])
+        if len(affected) != 0:
+            self._ranked = None
+        logging.debug("Индекс c-value: пересчитано {0} из {1}".format(len(affected), len(self._entries)))
+        return len(affected)
+
+    def get(self, pnormal_form: str) -> float:
+        """
+        :param pnormal_form: псевдонормальная форма кандидата
+        :return: c-value кандидата, None - если кандидата нет
+        """
+        entry = self._entries.get(pnormal_form, None)
+        return entry[5] if entry is not None else None
+
+    def terms(self, threshold: float = None) -> List[params]:
+        """
+        :param threshold: порог c-value, по умолчанию THRESHOLD
+        :return: термины выше порога по убыванию c-value (при равенстве - по убыванию длины), как у calculate
+        """
+        threshold = THRESHOLD if threshold is None else threshold
+        if self._ranked is None:
+            self._ranked = sorted(self._entries.values(), key=lambda entry: (-entry[5], -entry[1]))
+        return [params(name=entry[0], cvalue=entry[5]) for entry in self._ranked if entry[5] > threshold]
+
+
+def get_cvalue(wordcount: int, freq: float, containers: int, container_freq: float) -> float:
+    """
+    :param wordcount: количество слов кандидата
+    :param freq: частота кандидата
+    :param containers: количество более длинных кандидатов, содержащих данный
+    :param container_freq: сумма их частот
+    :return: c-value
+    """
+    if containers == 0:
+        return math.log(wordcount, 2) * freq
+    return math.log(wordcount, 2) * (freq - 1 / containers * container_freq)
+
+
+def calculate_by_group(c_group: List[int], graph: CandidateGraph, threshold: float = None) -> List[params]:
     """
     Подсчитывает c-value в группе терминологических кандидатов
-    :param c_group: малый перечень словосочетаний
-    :param candidates: полный перечень словосочетаний
+    :param c_group: позиции малого перечня словосочетаний в графе
+    :param graph: граф вложенности полного перечня словосочетаний
+    :param threshold: порог c-value, по умолчанию THRESHOLD
     :return: перечень слов/словосочетаний с метрикой 
     """
-    terms = []
-    for candidate in c_group:
-        is_nested = len(candidate.llinked) > 0
+    threshold = THRESHOLD if threshold is None else threshold
+    return make_terms(calculate_values(c_group, *graph.arrays(), threshold), graph)
+
+
+def get_upper_bounds(freq: np.ndarray, wordcount: np.ndarray) -> np.ndarray:
+    """
+    Верхние оценки c-value: log2(wordcount) * freq (частоты содержащих фраз только уменьшают значение)
+    :param freq: CandidateGraph.freq
+    :param wordcount: CandidateGraph.wordcount
+    :return: оценки в порядке кандидатов графа
+    """
+    if len(wordcount) == 0:
+        return np.zeros(0)
+    return get_log_table(wordcount)[wordcount] * freq
+
+
+def get_log_table(wordcount: np.ndarray) -> np.ndarray:
+    """
+    :param wordcount: CandidateGraph.wordcount
+    :return: log2 длин от 0 до наибольшей; через math.log - для совпадения с поэлементным подсчетом до последнего бита
+    """
+    return np.array([0.0] + [math.log(count, 2) for count in range(1, int(wordcount.max()) + 1)])
+
+
+def calculate_values(c_group: Iterable[int], offsets: np.ndarray, targets: np.ndarray, freq: np.ndarray,
+                     wordcount: np.ndarray, threshold: float) -> List[Tuple[int, float]]:
+    """
+    Подсчитывает c-value по массивам графа вложенности
+    :param c_group: позиции кандидатов
+    :param offsets: CandidateGraph.offsets
+    :param targets: CandidateGraph.targets
+    :param freq: CandidateGraph.freq
+    :param wordcount: CandidateGraph.wordcount
+    :param threshold: порог c-value
+    :return: (позиция, c-value) кандидатов выше порога; c-value None - в ссылках кандидата есть несуществующий id
+    """
+    values = []
+    for position in c_group:
+        if math.log(int(wordcount[position]), 2) * float(freq[position]) <= threshold:
+            continue
+        longer_phrases = targets[offsets[position]:offsets[position + 1]]
+        is_nested = len(longer_phrases) > 0
         if not is_nested:
-            cval = math.log(candidate.wordcount, 2) * candidate.freq
+            cval = math.log(int(wordcount[position]), 2) * float(freq[position])
         else:
-            longer_phrases = [find_candidate_by_id(candidates, link_id) for link_id in candidate.llinked]
-            if None in longer_phrases:
-                logging.error(
-                    "В ссылках фразы \"{0}\" закралась ссылка (x{1}) "
-                    "на несуществующий id".format(candidate.collocation, longer_phrases.count(None)))
+            if (longer_phrases < 0).any():
+                values.append((position, None))
                 continue
             pta = len(longer_phrases)  # должно быть равно len(candidate.llinked)
-            longer_phrase_freq = sum([phrase.freq for phrase in longer_phrases])
-            cval = math.log(candidate.wordcount, 2) * (candidate.freq - 1 / pta * longer_phrase_freq)
-        if cval > THRESHOLD:
-            terms.append(params(name=candidate.collocation, cvalue=cval))
+            longer_phrase_freq = float(freq[longer_phrases].sum())
+            cval = math.log(int(wordcount[position]), 2) * (float(freq[position]) - 1 / pta * longer_phrase_freq)
+        if cval > threshold:
+            values.append((position, cval))
+    return values
+
+
+def make_terms(values: List[Tuple[int, float]], graph: CandidateGraph) -> List[params]:
+    terms = []
+    for position, cval in values:
+        if cval is None:
+            logging.error(
+                "В ссылках фразы \"{0}\" закралась ссылка (x{1}) "
+                "на несуществующий id".format(graph.names[position], int((graph.links(position) < 0).sum())))
+            continue
+        terms.append(params(name=graph.names[position], cvalue=cval))
     return terms
 
 
-def parallel_conjugation(c_group: List[Collocation], candidates: List[Collocation],
-                         is_single_threaded: bool = False) -> List[params]:
+def calculate_range(shared: SharedArrays, threshold: float, task: range) -> List[Tuple[int, float]]:
+    """
+    Подсчет c-value в процессе общего пула
+    :param shared: массивы графа вложенности и порядок кандидатов в разделяемой памяти
+    :param threshold: порог c-value
+    :param task: диапазон индексов в порядке кандидатов
+    :return: (позиция, c-value)
+    """
+    offsets, targets, freq, wordcount, order = shared.arrays()
+    return calculate_values(order[task.start:task.stop].tolist(), offsets, targets, freq, wordcount, threshold)
+
+
+def parallel_conjugation(c_group: range, graph: CandidateGraph, order: np.ndarray,
+                         shared: SharedArrays = None, threshold: float = None) -> List[params]:
     """
     Функция многопоточного подчета стат метрики
-    :param c_group: группа кандидатов с одинаковым wordcount
-    :param candidates: полный перечень всех кандидатов
-    :param is_single_threaded: флаг - выполнять ли в одном потоке
+    :param c_group: диапазон индексов группы кандидатов с одинаковым wordcount в порядке order
+    :param graph: граф вложенности всех кандидатов
+    :param order: позиции кандидатов в графе по убыванию длины
+    :param shared: массивы графа и order в разделяемой памяти для общего пула процессов;
+     None - выполнять в одном потоке
+    :param threshold: порог c-value, по умолчанию THRESHOLD
     :return: перечень терминов
     """
-    logging.info("Разделяем на потоки")
-    spliced_group_list = split_tasks(c_group)
-    # TODO идея для оптимизации: ограничивать значения candidates для каждой из мини-групп
-    # оставить только те, что упоминаются в llinked
-    args = list(zip(spliced_group_list, [candidates for i in range(len(candidates))]))
+    threshold = THRESHOLD if threshold is None else threshold
+    if shared is None:
+        return make_terms(calculate_values(order[c_group.start:c_group.stop].tolist(), *graph.arrays(), threshold),
+                          graph)
+    # стоимость кандидата - число его ссылок (+1 за сам кандидат)
+    costs = np.diff(graph.offsets)[order[c_group.start:c_group.stop]] + 1
+    tasks = [range(c_group.start + task.start, c_group.start + task.stop) for task in executor.split_by_cost(costs)]
+    logging.debug("Разделили аргументы по задачам ({0})".format(len(tasks)))
     result = []
-    if not is_single_threaded:
-        logging.debug("Разделили аргументы по задачам ({0})".format(len(args)))
-        with multiprocessing.Pool(processes=len(args)) as pool:
-            immediate_results = pool.starmap(calculate_by_group, args)
-            for i in immediate_results:
-                result += i
-    else:
-        for arg in args:
-            result += calculate_by_group(arg[0], arg[1])
+    for values in executor.starmap(calculate_range, [(shared, threshold, task) for task in tasks]):
+        result += make_terms(values, graph)
     logging.debug("Готовы результаты обработки")
     return result
@@ -1,14 +1,9 @@
-import itertools
 import math
 import logging
-import multiprocessing
 from collections import namedtuple
-from typing import List, Dict
-from operator import itemgetter
-from ITermExtractor.Structures.WordStructures import Collocation, TaggedWord, Separator
-from itertools import groupby
-from helpers import split_tasks
-from ITermExtractor.Morph import find_candidate_by_id
+from typing import List, Dict, Tuple, Iterable
+from ITermExtractor.Structures.WordStructures import Collocation, TaggedWord, CorpusStatistics
+from ITermExtractor import executor
 
 params = namedtuple('params', ['name', 'termhood', 'unithood'])
 params.__doc__ = "Параметры терминологических подстрок"
@@ -16,6 +11,8 @@ params.name.__doc__ = "Слово/Фраза"
 params.termhood.__doc__ = "Терминологичность"
 params.unithood.__doc__ = "Синтагматичность"
 
+PARALLEL_LIMIT = 100000  # с какого числа кандидатов оценивать пакеты в пуле процессов
+
 cinfo = namedtuple('candidate_info', ['candidate', 'words'])
 cinfo.__doc__ = "Параметры терминологических подстрок"
 cinfo.candidate.__doc__ = "Слово/Фраза"
@@ -24,117 +21,90 @@ cinfo.words.__doc__ = "Слова, составляющие, словарь"
 
 # терминологичность высчитывает вероятность нахождения слова в доменно-спец документе, но как определять какой из них является доменно специфичным, если все документы посвящены 1 пред обл?
 # или же считать по всем и определять максимальное знач?
-def calculate_word_document_probability(word: str, document: List[List[TaggedWord]]):
-    """
-    Подсчет вероятности встречаемости слова в документе
-    :param word: слово с тегами
-    :param document: документ с тегами
-    :return:
-    """
-    freq = 0
-    for sentence in document:
-        for w in sentence:
-            if isinstance(w, Separator) or w is None:
-                continue
-            if w.normalized == word:
-                freq += 1
-    # total_word_count = sum(map(lambda x: len(x), filter(lambda  x: isinstance(x, TaggedWord), document)))
-    total_word_count = len(list(filter(lambda x: isinstance(x, TaggedWord), itertools.chain(*document))))
-    probability = freq / total_word_count
-    return word, probability
-
-
-# TODO test
-def calculate_word_probabilities(candidates: List[Collocation], documents: List[List[TaggedWord]]) -> List[cinfo]:
+def calculate_word_probabilities(candidates: List[Collocation], statistics: CorpusStatistics) -> List[cinfo]:
     """
     Подсчитывает вероятности встречаемости слов из кандидатов и сводит в единую структуру
     :param candidates: кандидаты в термины
-    :param documents: документы
-    :return:
+    :param statistics: частоты слов по документам и корпусу
+    :return: кандидаты и (наибольшая по документам вероятность, вероятность в корпусе) каждого их слова
     """
-    # TODO calc all w probs -> dict
-    # candidate, [word, word_prob_doc, word_prob_general]
-    words = []
-    candidate_infos = []
-    for candidate in candidates:
-        normalized_words = candidate.pnormal_form.split()
-        words += normalized_words
-        info = (candidate, words)
-        candidate_infos.append(info)
+    return [cinfo(candidate, [(statistics.max_document_probability(word), statistics.probability(word))
+                              for word in candidate.pnormal_form.split()])
+            for candidate in candidates]
 
-    words = list(set(words))
-    corpora = list(itertools.chain(*documents))
-    word_dict = {}
 
+def get_word_scores(words: Iterable[str], statistics: CorpusStatistics) -> Dict[str, Tuple[float, float]]:
+    """
+    Вклад каждого слова в метрики GlossEx, подсчитывается один раз на запуск
+    :param words: нормальные формы слов кандидатов
+    :param statistics: частоты слов по документам и корпусу
+    :return: слово -> (log2(Pd(Wi) / P(Wi)) - вклад в терминологичность, P(Wi) * число слов корпуса - в знаменатель
+     синтагматичности); Pd(Wi) - наибольшая по документам вероятность слова, P(Wi) - вероятность слова в корпусе
+    """
+    scores = dict()
     for word in words:
-        word_arg = [word for i in range(len(documents))]
-        document_probabilities = list(map(calculate_word_document_probability, word_arg, documents))  # Pd(Wi)
-        corpora_probability = calculate_word_document_probability(word, corpora)
-        pd_wi = max(document_probabilities, key=itemgetter(1))
-        pd_wi = pd_wi[1] if pd_wi is not None else 0
-        word_dict[word] = (pd_wi, corpora_probability)
+        if word not in scores:
+            probability = statistics.probability(word)
+            scores[word] = (math.log2(statistics.max_document_probability(word) / probability),
+                            probability * statistics.lexicon.part_count)
+    return scores
 
-    for i in range(len(candidate_infos)):
-        can = candidate_infos[i][0]
-        words = candidate_infos[i][1]
-        can_word_info = [word_dict[w] for w in words]
-        candidate_infos[i] = cinfo(can, can_word_info )
-
-    return candidate_infos
 
+def calculate(candidates: List[Collocation], documents: List[List[List[TaggedWord]]] = None,
+              statistics: CorpusStatistics = None, is_single_threaded: bool = False) -> List[params]:
+    """
+    Подсчитывает терминологичность и синтагматичность (GlossEx) терминологических кандидатов.
+    Частоты корпуса и вклад каждого слова подсчитываются один раз, затем кандидаты оцениваются пакетами;
+    большие перечни делятся на пакеты для общего пула процессов (в задачи передаются лишь слова пакета, без документов)
+    :param candidates: кандидаты в термины
+    :param documents: документы, разбитые на предложения; нужны, только если statistics не передана
+    :param statistics: частоты слов по документам, если уже подсчитаны
+    :param is_single_threaded: флаг, True - выполнять в одном потоке
+    :return: список терминов со значениями метрик
+    """
+    if statistics is None:
+        if documents is None:
+            raise ValueError("Необходимы документы или частоты слов по ним")
+        statistics = CorpusStatistics(documents)
+    logging.debug("Начало подсчета GlossEx")
+    batch = ([candidate.collocation for candidate in candidates],
+             [candidate.pnormal_form.split() for candidate in candidates],
+             [candidate.wordcount for candidate in candidates], [candidate.freq for candidate in candidates])
+    word_scores = get_word_scores((word for words in batch[1] for word in words), statistics)
+    logging.debug("Подсчитан вклад {0} слов".format(len(word_scores)))
+
+    if is_single_threaded or len(candidates) < PARALLEL_LIMIT:
+        result = calculate_batch(*batch, word_scores)
+    else:
+        tasks = executor.split_by_cost(batch[2])
+        args = []
+        for task in tasks:
+            names, words, wordcounts, freqs = [part[task.start:task.stop] for part in batch]
+            args.append((names, words, wordcounts, freqs,
+                         dict((word, word_scores[word]) for candidate_words in words for word in candidate_words)))
+        logging.debug("Разделили кандидатов по задачам ({0})".format(len(tasks)))
+        result = [term for results in executor.starmap(calculate_batch, args) for term in results]
 
-def threading_calculate(candidates: List[Collocation], documents: List[List[TaggedWord]], processes: int=1) -> List[params]:
-    with multiprocessing.Pool(processes=processes) as pool:
-        candidate_tasks = split_tasks(candidates, processes)
-        document_tasks = [documents for i in range(processes)]
-        args = zip(candidate_tasks, document_tasks)
-        result = pool.starmap(calculate, args)
+    logging.debug("Конец обработки, GlossEx")
     return result
 
 
-def calculate(candidates: List[Collocation], documents: List[List[TaggedWord]]) -> List[params]:
+def calculate_batch(names: List[str], words: List[List[str]], wordcounts: List[int], freqs: List[float],
+                    word_scores: Dict[str, Tuple[float, float]]) -> List[params]:
+    """
+    Оценивает пакет кандидатов по заранее подсчитанному вкладу слов
+    :param names: словосочетания
+    :param words: нормальные формы слов каждого словосочетания
+    :param wordcounts: количество слов
+    :param freqs: частоты
+    :param word_scores: вклад слов, см. get_word_scores()
+    :return: список терминов со значениями метрик
+    """
     result = list()
-
-    corpora = list(itertools.chain(*documents))
-    # corpora_words = list(filter(lambda x: isinstance(x, TaggedWord), itertools.chain(*corpora)))
-    logging.debug("Начало подсчета GlossEx")
-    counter = 0
-
-    for candidate in candidates:
-        if counter % 250 == 0:
-            logging.debug("Подсчет знач для {0}/{1}".format(counter, len(candidates)))
-        counter += 1
-        normalized_words = candidate.pnormal_form.split()
-        args = list(itertools.product(normalized_words, documents))
-        word_args = list(map(lambda x: x[0], args))
-        document_args = list(map(lambda x: x[1], args))
-        document_probabilities = list(map(calculate_word_document_probability, word_args, document_args))  # Pd(Wi)
-
-        document_probabilities_srt = sorted(document_probabilities, key=itemgetter(0))
-        document_probabilities_grp = groupby(document_probabilities_srt, key=itemgetter(0))
-        # list(map(lambda x: (x[0], list(x[1])), document_probabilities_grp))
-        document_probabilities_chosen = list(map(lambda key_probs: max(key_probs[1], default=(key_probs[0], 0)), document_probabilities_grp))
-
-        # corpora_arg = itertools.product(corpora_words, repeat=len(normalized_words))
-        corpora_arg = [corpora for i in range(len(normalized_words))]
-
-        with multiprocessing.Pool(processes=len(normalized_words)) as pool:
-            args = zip(normalized_words, corpora_arg)
-            corpora_probabilities = pool.starmap(calculate_word_document_probability, args)
-
-        # corpora_probabilities = map(calculate_word_document_probability, normalized_words, corpora_arg)
-
-        word_probabilities = [(w1, a, b)
-                              for w1, a in document_probabilities_chosen
-                              for w2, b in corpora_probabilities if w1 == w2]
-
-        termhood = candidate.wordcount ** (-1) * sum([math.log2(dp / cp) for w, dp, cp in word_probabilities])
-
-        total_corpora_word_count = sum(list(map(lambda x: len(x), corpora)))
-        u_demominator = sum(map(lambda x: x[1] * total_corpora_word_count, corpora_probabilities))
-        unithood = candidate.wordcount * candidate.freq * math.log10(candidate.freq) / u_demominator
+    for name, normalized_words, wordcount, freq in zip(names, words, wordcounts, freqs):
+        termhood = wordcount ** (-1) * sum([word_scores[word][0] for word in sorted(normalized_words)])
+        u_demominator = sum(word_scores[word][1] for word in normalized_words)
+        unithood = wordcount * freq * math.log10(freq) / u_demominator
         # TODO возможно, freq здесь не количество вхождений
-        result.append(params(candidate.collocation, termhood, unithood))
-
-    logging.debug("Конец обработки, GlossEx")
+        result.append(params(name, termhood, unithood))
     return result
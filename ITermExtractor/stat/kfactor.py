@@ -1,10 +1,10 @@
-from ITermExtractor.Structures.WordStructures import Collocation, TaggedWord
-from typing import List
+from ITermExtractor.Structures.WordStructures import Collocation
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from typing import List, Iterator, Tuple
 from operator import itemgetter
-from ITermExtractor.Morph import find_candidate_by_id
 from itertools import groupby
+from helpers import select_top
 import logging
-import multiprocessing
 
 KFACTOR = 0.7
 THRESHOLD = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
@@ -16,40 +16,57 @@ def is_beyond_threshold(phrase: Collocation) -> bool:
     return result
 
 
-def calculate(candidates: List[Collocation], dictionary: List[TaggedWord]) -> List[Collocation]:
+def calculate(candidates: List[Collocation], graph: CandidateGraph = None, top_k: int = 0) -> List[Collocation]:
+    """
+    Отбирает термины по k-фактору
+    :param candidates: список терминологических кандидатов
+    :param graph: граф вложенности тех же кандидатов, если уже построен
+    :param top_k: сколько самых частотных терминов вернуть, 0 - все
+    :return: термины по убыванию частоты
+    """
+    logger = logging.getLogger()
+    groups = calculate_by_length(candidates, graph, top_k)
+    result_list = select_top((term for wordcount, group in groups for term in group), top_k, key=itemgetter('freq'))
+    logger.info("Список терминов сформирован, элементов: {0}".format(len(result_list)))
+    return result_list
+
+
+def calculate_by_length(candidates: List[Collocation], graph: CandidateGraph = None,
+                        top_k: int = 0) -> Iterator[Tuple[int, List[Collocation]]]:
+    """
+    Отбирает термины по группам кандидатов одной длины, от длинных к коротким;
+    группа выдается сразу после обработки
+    :param candidates: список терминологических кандидатов
+    :param graph: граф вложенности тех же кандидатов, если уже построен
+    :param top_k: сколько самых частотных терминов оставить в каждой группе, 0 - все
+    :return: (длина, термины группы по убыванию частоты)
+    """
     logger = logging.getLogger()
-    result_list = []
     logger.info("Начало статистической проверки ")
-    candidates = sorted(candidates, key=itemgetter('wordcount'), reverse=True)
+    if graph is None:
+        graph = CandidateGraph(candidates)
+    positions = sorted(range(len(graph)), key=lambda position: graph.wordcount[position], reverse=True)
 
     grouped_by_len = dict()
-    candidate_lengths = []
 
-    for key, value_sitter in groupby(candidates, key=itemgetter('wordcount')):
+    for key, value_sitter in groupby(positions, key=lambda position: int(graph.wordcount[position])):
         grouped_by_len[key] = list(value_sitter)
-        candidate_lengths.append(key)
 
     for index, c_group in grouped_by_len.items():
-        for candidate in c_group:
-            is_nested = len(candidate.llinked) > 0
+        result_list = []
+        for position in c_group:
+            candidate = graph.candidates[position]
+            longer_phrases = graph.links(position)
+            is_nested = len(longer_phrases) > 0
             if not is_nested:
                 if is_beyond_threshold(candidate):
                     result_list.append(candidate)
             else:
-                longer_phrases = [find_candidate_by_id(candidates, link_id) for link_id in candidate.llinked]
-                for longer_term in longer_phrases:
-                    if longer_term.freq > KFACTOR * candidate.freq:
-                        if is_beyond_threshold(candidate) and candidate not in result_list:
-                            result_list.append(candidate)
-                    else:
-                        if is_beyond_threshold(longer_term) and longer_term not in candidates:
-                            if longer_term not in result_list:
-                                result_list.append(longer_term)
-                                if candidate in result_list:
-                                    result_list.remove(candidate)
+                # более длинный кандидат сам есть в списке candidates, поэтому заменить им вложенный нельзя:
+                # вложенный остается, если хоть один содержащий его встречается чаще KFACTOR * freq
+                longer_phrases = longer_phrases[longer_phrases >= 0]
+                is_frequent = (graph.freq[longer_phrases] > KFACTOR * candidate.freq).any()
+                if is_frequent and is_beyond_threshold(candidate):
+                    result_list.append(candidate)
         logging.info("Кандидаты длиной {0} сл. обработаны".format(index))
-
-    logger.info("Список терминов сформирован, элементов: {0}. Сортировка впереди".format(len(result_list)))
-    result_list = sorted(result_list, key=itemgetter('freq'), reverse=True)
-    logger.info("Список терминов сформирован, элементов: {0}".format(len(result_list)))
-    return result_list
+        yield index, select_top(result_list, top_k, key=itemgetter('freq'))
@@ -0,0 +1,60 @@
+import logging
+from collections import namedtuple
+from typing import List
+
+import numpy as np
+
+import ITermExtractor.stat.cvalue as cvalue
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from ITermExtractor.Structures.ContextIndex import ContextIndex
+from ITermExtractor.Structures.WordStructures import Collocation
+
+params = namedtuple('params', ['name', 'ncvalue'])
+params.__doc__ = "Параметры терминологических подстрок"
+params.name.__doc__ = "Слово/Фраза"
+params.ncvalue.__doc__ = "Величина nc-value"
+
+CVALUE_WEIGHT = 0.8
+CONTEXT_WEIGHT = 0.2
+
+
+def calculate(candidates: List[Collocation], context: ContextIndex, graph: CandidateGraph = None,
+              is_single_threaded: bool = False, threshold: float = None, weight_terms: int = 0,
+              top_k: int = 0) -> List[params]:
+    """
+    Подсчитывает nc-value: термины, ранжированные cvalue.calculate, переупорядочиваются с учетом контекстных слов.
+    Вес контекстного слова - доля лучших по c-value терминов, рядом с которыми оно встречается;
+    nc-value = 0.8 * c-value + 0.2 * сумма (частота слова рядом с термином * вес слова)
+    :param candidates: список терминологических кандидатов
+    :param context: индекс контекстных слов, собранный фильтром при извлечении тех же кандидатов
+    :param graph: граф вложенности тех же кандидатов, если уже построен
+    :param is_single_threaded: флаг, True - подсчет c-value в одном потоке
+    :param threshold: порог c-value, по умолчанию cvalue.THRESHOLD
+    :param weight_terms: по скольким лучшим по c-value терминам взвешиваются контекстные слова, 0 - по всем
+    :param top_k: сколько лучших терминов вернуть, 0 - все
+    :return: список терминов со значениями nc-value
+    """
+    if graph is None:
+        graph = CandidateGraph(candidates)
+    terms = cvalue.calculate(candidates, is_single_threaded, graph, threshold=threshold)
+    if len(terms) == 0:
+        return []
+    positions = dict((name, position) for position, name in enumerate(graph.names))
+    offsets, word_ids, counts = context.arrays([graph.candidates[positions[term.name]].pnormal_form
+                                                for term in terms])
+    weight_terms = len(terms) if weight_terms <= 0 else min(weight_terms, len(terms))
+
+    # слова в строке термина не повторяются, поэтому bincount по первым weight_terms строкам - число терминов
+    term_counts = np.bincount(word_ids[:offsets[weight_terms]], minlength=len(context.words))
+    weights = term_counts / weight_terms
+    rows = np.repeat(np.arange(len(terms)), np.diff(offsets))
+    context_factor = np.bincount(rows, weights=counts * weights[word_ids], minlength=len(terms))
+    ncvalues = CVALUE_WEIGHT * np.array([term.cvalue for term in terms]) + CONTEXT_WEIGHT * context_factor
+
+    order = np.argsort(-ncvalues, kind='stable')
+    if top_k > 0:
+        order = order[:top_k]
+    logging.info("Подсчет nc-value закончен, контекстных слов: {0}, терминов: {1}"
+                 .format(len(context.words), len(order)))
+    return [params(name=terms[index].name, ncvalue=value)
+            for index, value in zip(order.tolist(), ncvalues[order].tolist())]
@@ -5,9 +5,12 @@
 
 import re
 import os
+import logging
 import ITermExtractor.Morph as m
+from collections import Counter
 from typing import List
 from ITermExtractor.Morph import TaggedWord, Separator
+from ITermExtractor.linguistic_filter import get_duplicate_statistics
 
 
 def split_sentences(input_text: str) -> str:
@@ -75,10 +78,16 @@ def parse_text(input_text: str) -> List[List[TaggedWord]]:
     :return: список предложений с тэгами частей речи слов
     """
     tagged_sent_list = []
-    sentences = split_sentences(input_text)
-    for sentence in sentences.splitlines():
-        if sentence != "":
+    sentences = [sentence for sentence in split_sentences(input_text).splitlines() if sentence != ""]
+    tagged_cache = dict()  # повторяющиеся предложения размечаются один раз
+    for sentence in sentences:
+        tag_info = tagged_cache.get(sentence, None)
+        if tag_info is None:
             tag_info = tag_collocation(sentence)
-            # tagged_sent_list += tag_info
-            tagged_sent_list.append(tag_info)
+            tagged_cache[sentence] = tag_info
+        # tagged_sent_list += tag_info
+        tagged_sent_list.append(list(tag_info))
+    statistics = get_duplicate_statistics(list(Counter(sentences).values()))
+    logging.info("Размечено предложений {0}, различных {1} (доля повторов {2:.1%})"
+                 .format(statistics.sentences, statistics.unique, statistics.duplicate_ratio))
     return tagged_sent_list
@@ -1,5 +1,6 @@
 import unittest
 from ITermExtractor.linguistic_filter import *
+from ITermExtractor import executor
 
 
 class TestMorphy(unittest.TestCase):
@@ -164,6 +165,47 @@ class TestMorphy(unittest.TestCase):
         self.assertEqual(index_1, 0)
         self.assertEqual(index_2, 4)
 
+    def test_bounded_distance(self):
+        from pyxdameraulevenshtein import damerau_levenshtein_distance
+        pairs = [('огонь артиллерия', 'огня артиллерии'), ('состояние инженерный оборудование',
+                                                           'состоянием инженерных оборудований'),
+                 ('боевой порядок', 'боевые порядки'), ('CA', 'ABC'), ('', 'огонь')]
+        for first, second in pairs:
+            distance = damerau_levenshtein_distance(first, second)
+            for limit in range(0, distance + 2):
+                expected_result = distance if distance <= limit else limit + 1
+                self.assertEqual(m.bounded_damerau_levenshtein_distance(first, second, limit), expected_result)
+
+    def test_agreed_normal_form(self):
+        lexicon = Lexicon([m.tag_collocation('огонь полковой артиллерии живая сила противника')])
+        pnormal_forms = ['огонь полковой артиллерия', 'живой сила противник']
+        surface_forms = ['огнем полковой артиллерии', 'живой силе противника']
+        collocations = [[lexicon[word] for word in pnormal_form.split(' ')] for pnormal_form in pnormal_forms]
+        expected_results = ['огонь полковой артиллерии', 'живая сила противника']
+        self.assertEqual(m.get_normal_forms(collocations, surface_forms), expected_results)
+        self.assertEqual(m.get_normal_forms(collocations), expected_results)
+        self.assertEqual(m.get_normal_form([]), '')
+
+    def test_collocation_normal_forms_in_pool(self):
+        def make_groups():
+            return [('огонь артиллерия', [Collocation(collocation=c, wordcount=2, freq=1)
+                                          for c in ['огня артиллерии', 'огонь артиллерии']], 'огонь'),
+                    ('ёмкость огонь', [Collocation(collocation=c, wordcount=2, freq=1)
+                                       for c in ['ёмкости огня', 'ёмкость огня']], 'ёмкость')]
+        expected_groups = make_groups()
+        expected_results = m.get_collocation_normal_forms(expected_groups, is_single_threaded=True)
+        parallel_limit = m.PARALLEL_NORMAL_FORM_LIMIT
+        m.PARALLEL_NORMAL_FORM_LIMIT = 0
+        try:
+            executor.start(2)
+            groups = make_groups()
+            self.assertEqual(m.get_collocation_normal_forms(groups), expected_results)
+            self.assertEqual([[c.collocation for c in collocations] for key, collocations, main_word in groups],
+                             [[c.collocation for c in collocations] for key, collocations, main_word in expected_groups])
+        finally:
+            m.PARALLEL_NORMAL_FORM_LIMIT = parallel_limit
+            executor.shutdown()
+
 
 if __name__ == "__main__":
     unittest.main()
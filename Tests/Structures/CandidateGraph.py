@@ -0,0 +1,42 @@
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from ITermExtractor.Structures.WordStructures import Collocation
+from ITermExtractor.Morph import find_candidate_by_id
+import unittest
+import pickle
+
+
+class TestCandidateGraph(unittest.TestCase):
+    def setUp(self):
+        self.candidates = [Collocation('ведения огня артиллерии', 3, 2, 'ведение огонь артиллерия', [], 10),
+                           Collocation('огонь артиллерии', 2, 5, 'огонь артиллерия', [10], 11),
+                           Collocation('огонь', 1, 9, 'огонь', [11, 10], 12),
+                           Collocation('артиллерия', 1, 4, 'артиллерия', [11, 42], 13)]
+
+    def test_links(self):
+        graph = CandidateGraph(self.candidates)
+        self.assertEqual(len(graph), 4)
+        self.assertEqual(graph.offsets.tolist(), [0, 0, 1, 3, 5])
+        self.assertEqual(graph.links(0).tolist(), [])
+        self.assertEqual(graph.links(2).tolist(), [1, 0])
+        self.assertEqual(graph.links(3).tolist(), [1, -1])
+        self.assertEqual(graph.freq.tolist(), [2, 5, 9, 4])
+        self.assertEqual(graph.wordcount.tolist(), [3, 2, 1, 1])
+        self.assertEqual(graph.position(12), 2)
+        self.assertEqual(graph.position(42), -1)
+
+    def test_candidate_lookup(self):
+        graph = CandidateGraph(self.candidates)
+        self.assertIs(graph.get(12), self.candidates[2])
+        self.assertIsNone(graph.get(42))
+        self.assertIs(find_candidate_by_id(graph, 11), self.candidates[1])
+        self.assertIs(find_candidate_by_id(self.candidates, 11), self.candidates[1])
+        self.assertIsNone(find_candidate_by_id(self.candidates, 42))
+
+    def test_pickle_ability(self):
+        graph = pickle.loads(pickle.dumps(CandidateGraph(self.candidates)))
+        self.assertEqual(graph.targets.tolist(), [0, 1, 0, 1, -1])
+        self.assertEqual(graph.candidates, self.candidates)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+from ITermExtractor.Structures.ContextIndex import ContextIndex
+from ITermExtractor.linguistic_filter import AdjNounLinguisticFilter
+import ITermExtractor.Morph as m
+import unittest
+
+
+class TestContextIndex(unittest.TestCase):
+    def test_filter_pass(self):
+        sentences = [m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника'),
+                     m.tag_collocation('огневые точки противника уничтожены')]
+        context = ContextIndex()
+        expected = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True)
+        terms = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True, context=context)
+        self.assertEqual(terms, expected)
+        self.assertEqual(context.get('огневой точка противник'), {'подавить': 1, 'уничтожить': 1})
+        self.assertEqual(context.get('полковой артиллерия'), {'огонь': 1, 'подавить': 1})
+        self.assertEqual(context.get('огневой вал'), {})
+
+    def test_arrays(self):
+        sentence = m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника')
+        context = ContextIndex()
+        AdjNounLinguisticFilter().filter_text([sentence, sentence], is_single_threaded=True, context=context)
+        offsets, word_ids, counts = context.arrays(['огневой вал', 'полковой артиллерия'])
+        self.assertEqual(offsets.tolist(), [0, 0, 2])
+        self.assertEqual(sorted(context.words[i] for i in word_ids), ['огонь', 'подавить'])
+        self.assertEqual(counts.tolist(), [2, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,17 @@
+from ITermExtractor.Structures.Subgrams import make_subgrams, make_subkeys
+import unittest
+
+
+class TestSubgrams(unittest.TestCase):
+    def test_subgrams(self):
+        self.assertEqual(make_subgrams(('огонь', 'полковой', 'артиллерия')),
+                         [('огонь', 'полковой'), ('полковой', 'артиллерия'), ('огонь',), ('полковой',), ('артиллерия',)])
+        self.assertEqual(make_subgrams(('огонь',)), [])
+
+    def test_subkeys(self):
+        self.assertEqual(make_subkeys('огонь огонь'), ['огонь'])
+        self.assertEqual(make_subkeys('огонь'), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
-from ITermExtractor.Structures.WordStructures import Collocation
+from ITermExtractor.Structures.WordStructures import Collocation, Lexicon, TaggedWord, Separator, CorpusStatistics
+from ITermExtractor.Structures.PartOfSpeech import PartOfSpeech
+from ITermExtractor.Structures.Case import Case
 from copy import deepcopy
 import unittest
 import pickle
@@ -92,5 +94,48 @@ class TestCollocation(unittest.TestCase):
         self.assertEqual(originals, unpacked)
 
 
+class TestLexicon(unittest.TestCase):
+    def test_counts(self):
+        sentences = [[TaggedWord(word='огня', pos=PartOfSpeech.noun, case=Case.genitive, normalized='огонь'),
+                      TaggedWord(word='артиллерии', pos=PartOfSpeech.noun, case=Case.genitive, normalized='артиллерия'),
+                      Separator(symbol=',')],
+                     [TaggedWord(word='огонь', pos=PartOfSpeech.noun, case=Case.accusative, normalized='огонь'),
+                      None]]
+        lexicon = Lexicon(sentences)
+        self.assertEqual(len(lexicon), 2)
+        self.assertEqual(lexicon['огонь'], TaggedWord(word='огонь', pos=PartOfSpeech.noun, case=Case.nominative,
+                                                      normalized='огонь'))
+        self.assertEqual(lexicon.counts['огонь'], 2)
+        self.assertEqual(lexicon.word_count, 3)
+        self.assertEqual(lexicon.part_count, 5)
+        self.assertEqual(lexicon.add_sentences([[TaggedWord(word='огнем', pos=PartOfSpeech.noun,
+                                                            case=Case.ablative, normalized='огонь')]]),
+                         {'огонь': 1})
+        self.assertEqual(lexicon.counts['огонь'], 3)
+        self.assertEqual(lexicon.get('пехота', 'пехота'), 'пехота')
+
+
+class TestCorpusStatistics(unittest.TestCase):
+    def test_counts(self):
+        fire = TaggedWord(word='огня', pos=PartOfSpeech.noun, case=Case.genitive, normalized='огонь')
+        artillery = TaggedWord(word='артиллерии', pos=PartOfSpeech.noun, case=Case.genitive, normalized='артиллерия')
+        documents = [[[fire, artillery, Separator(symbol=',')], [fire, None]],
+                     [[artillery]],
+                     []]
+        statistics = CorpusStatistics(documents)
+        self.assertEqual(len(statistics), 3)
+        self.assertEqual(statistics.document_totals, [3, 1, 0])
+        lexicon = Lexicon([s for d in documents for s in d])
+        self.assertEqual(dict(statistics.lexicon), dict(lexicon))
+        self.assertEqual(statistics.lexicon.counts, lexicon.counts)
+        self.assertEqual(statistics.lexicon.word_count, 4)
+        self.assertEqual(statistics.lexicon.part_count, lexicon.part_count)
+        self.assertAlmostEqual(statistics.probability('артиллерия'), 1 / 2)
+        self.assertAlmostEqual(statistics.document_probability('огонь', 0), 2 / 3)
+        self.assertEqual(statistics.document_probability('огонь', 2), 0)
+        self.assertEqual(statistics.max_document_probability('артиллерия'), 1)
+        self.assertEqual(statistics.max_document_probability('пехота'), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
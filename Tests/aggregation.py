@@ -0,0 +1,42 @@
+from ITermExtractor.aggregation import CandidateAggregator
+from ITermExtractor.Structures.WordStructures import Collocation
+import os
+import unittest
+
+
+class TestCandidateAggregator(unittest.TestCase):
+    sentence_candidates = [
+        [Collocation(collocation='огня артиллерии', pnormal_form='огонь артиллерия', freq=2),
+         Collocation(collocation='ведения огня', pnormal_form='ведение огонь', freq=1)],
+        [Collocation(collocation='огонь артиллерии', pnormal_form='огонь артиллерия', freq=1),
+         Collocation(collocation='система огня', pnormal_form='система огонь', freq=1)],
+        [Collocation(collocation='огня артиллерии', pnormal_form='огонь артиллерия', freq=1),
+         Collocation(collocation='ведения огня', pnormal_form='ведение огонь', freq=1)]]
+
+    def collect(self, aggregator: CandidateAggregator):
+        for candidates in self.sentence_candidates:
+            aggregator.add(candidates)
+        return [(key, [(c.collocation, c.freq) for c in c_vars], records) for key, c_vars, records in aggregator.groups()]
+
+    def test_groups(self):
+        expected = [('ведение огонь', [('ведения огня', 2)], 2),
+                    ('огонь артиллерия', [('огня артиллерии', 3), ('огонь артиллерии', 1)], 3),
+                    ('система огонь', [('система огня', 1)], 1)]
+        with CandidateAggregator() as aggregator:
+            self.assertEqual(self.collect(aggregator), expected)
+            self.assertEqual(aggregator.records, 6)
+
+    def test_spill(self):
+        with CandidateAggregator() as aggregator:
+            expected = self.collect(aggregator)
+        aggregator = CandidateAggregator(memory_limit=1)
+        result = self.collect(aggregator)
+        runs = list(aggregator._runs)
+        self.assertEqual(len(runs), 3)
+        self.assertEqual(result, expected)
+        aggregator.close()
+        self.assertFalse(any(os.path.exists(run) for run in runs))
+
+
+if __name__ == "__main__":
+    unittest.main()
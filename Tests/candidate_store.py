@@ -0,0 +1,49 @@
+from ITermExtractor.candidate_store import CandidateStore
+from ITermExtractor.linguistic_filter import NounPlusLinguisticFilter
+from operator import itemgetter
+import ITermExtractor.Morph as m
+import tempfile
+import unittest
+import os
+
+
+class TestCandidateStore(unittest.TestCase):
+    sentences = ['Огонь артиллерии планировать в соответствии с обеспеченностью боеприпасами',
+                 'Подготовленные участки и огни артиллерии записывать на щитах орудий, таблицах за брусом, имея все необходимые данные для ведения огня артиллерии ночью и в условиях задымления',
+                 'Система огня должна обеспечить непроницаемость боевых порядков для контратак пехоты противника и танков'
+                 ]
+
+    def test_append_equals_full_run(self):
+        tag_info = [m.tag_collocation(s) for s in self.sentences]
+        expected = NounPlusLinguisticFilter().filter_text(tag_info)
+
+        store = CandidateStore(NounPlusLinguisticFilter())
+        store.append(tag_info[:1])
+        store.append(tag_info[1:])
+
+        result = store.candidates()
+        self.assertEqual(sorted(result, key=itemgetter('collocation')), sorted(expected, key=itemgetter('collocation')))
+        self.assertEqual(store.get('огонь артиллерия').freq, 3)
+
+        ids = dict([(c.id, c.pnormal_form) for c in result])
+        self.assertEqual(len(ids), len(result))
+        self.assertEqual(sorted(ids[i] for i in store.get('огонь').llinked),
+                         ['ведение огонь', 'ведение огонь артиллерия', 'огонь артиллерия', 'система огонь'])
+        self.assertEqual([ids[i] for i in store.get('ведение огонь').llinked], ['ведение огонь артиллерия'])
+
+    def test_persistence(self):
+        tag_info = [m.tag_collocation(s) for s in self.sentences]
+        store = CandidateStore(NounPlusLinguisticFilter())
+        store.append(tag_info[:2])
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'store.pickle')
+            store.save(filename)
+            loaded = CandidateStore.load(filename)
+        loaded.append(tag_info[2:])
+        store.append(tag_info[2:])
+        self.assertEqual(store.candidates(), loaded.candidates())
+        self.assertEqual([c.llinked for c in store.candidates()], [c.llinked for c in loaded.candidates()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+from ITermExtractor import executor
+from ITermExtractor.executor import SharedArrays
+import numpy as np
+import unittest
+import pickle
+
+
+def sum_shared(shared: SharedArrays) -> list:
+    return [float(array.sum()) for array in shared.arrays()]
+
+
+class TestExecutor(unittest.TestCase):
+    def tearDown(self):
+        executor.shutdown()
+
+    def test_pool_reuse(self):
+        pool = executor.start(2)
+        self.assertIs(executor.get_pool(), pool)
+        self.assertIs(executor.start(4), pool)
+        executor.shutdown()
+        self.assertIsNot(executor.get_pool(), pool)
+
+    def test_pool_size(self):
+        self.assertEqual(executor.get_pool_size(3), 3)
+        self.assertGreater(executor.get_pool_size(), 0)
+
+    def test_split_by_cost(self):
+        costs = [1, 5, 1, 1, 1, 1, 5, 1, 1, 1, 1]
+        tasks = executor.split_by_cost(costs, 3, 0)
+        self.assertEqual([index for task in tasks for index in task], list(range(len(costs))))
+        self.assertEqual([sum(costs[index] for index in task) for task in tasks], [7, 8, 4])
+        self.assertEqual(executor.split_by_cost(costs, 3, 100), [range(0, len(costs))])
+        self.assertEqual(executor.split_by_cost([], 3), [])
+
+    def test_shared_arrays(self):
+        arrays = (np.arange(10, dtype=np.int64), np.linspace(0, 1, 5))
+        with SharedArrays(arrays) as shared:
+            copy = pickle.loads(pickle.dumps(shared))
+            self.assertEqual([array.tolist() for array in copy.arrays()], [array.tolist() for array in arrays])
+            results = executor.start(2).map(sum_shared, [shared] * 4)
+            executor.detach()
+        self.assertEqual(results, [[45.0, 2.5]] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
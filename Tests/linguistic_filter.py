@@ -130,6 +130,53 @@ class TestLinguisticFilter(unittest.TestCase):
 
         link_integrity_checks = [all(link in result_dict for link in p.llinked) for p in result_with_links]
         self.assertTrue(all(link_integrity_checks))
+
+    def test_link_word_boundaries(self):
+        collocations = [Collocation(collocation='успеха действий', pnormal_form='успех действие', freq=1, cid=1),
+                        Collocation(collocation='неуспеха действий', pnormal_form='неуспех действие', freq=1, cid=2),
+                        Collocation(collocation='причины неуспеха действий', pnormal_form='причина неуспех действие', freq=1, cid=3),
+                        Collocation(collocation='действий', pnormal_form='действие', freq=2, cid=4),
+                        Collocation(collocation='действий действий', pnormal_form='действие действие', freq=1, cid=5)]
+        linked = dict([(c.id, c.llinked) for c in define_collocation_links(collocations)])
+        self.assertEqual(linked, {1: [], 2: [3], 3: [], 4: [1, 2, 5, 3], 5: []})
+
+    def test_link_copy_modes(self):
+        collocations = [Collocation(collocation='ведения огня', pnormal_form='ведение огонь', freq=1, llinked=[], cid=1),
+                        Collocation(collocation='огня', pnormal_form='огонь', freq=3, llinked=[], cid=2)]
+        copied = define_collocation_links(collocations, is_inplace=False)
+        self.assertEqual([c.llinked for c in collocations], [[], []])
+        self.assertEqual([c.llinked for c in copied], [[1], []])
+        self.assertFalse(any(c is o for c in copied for o in collocations))
+
+        linked = define_collocation_links(collocations)
+        self.assertIs(linked[0], collocations[1])
+        self.assertEqual(collocations[1].llinked, [1])
+
+    def test_duplicate_sentences(self):
+        sentence = m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника')
+        other_sentence = m.tag_collocation('огнем полковой артиллерии')
+        sentences = [sentence, other_sentence, list(sentence), list(sentence)]
+        prepared_text = prepare_text(sentences)
+        self.assertEqual([count for runs, count in prepared_text], [3, 1])
+        self.assertEqual(get_duplicate_statistics([count for runs, count in prepared_text]).duplicate_ratio, 0.5)
+
+        result = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True)
+        expected_result = AdjNounLinguisticFilter().filter_text(
+            sentences, is_single_threaded=True, prepared_text=[(prepare_sentence(s), 1) for s in sentences])
+        self.assertEqual(result, expected_result)
+        self.assertEqual(dict((c.pnormal_form, c.freq) for c in result)['огонь полковой артиллерия'], 4)
+
+    def test_dense_ids(self):
+        sentences = [m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника'),
+                     m.tag_collocation('огнем полковой артиллерии')]
+        first_run = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True)
+        second_run = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True)
+        self.assertEqual(sorted(c.id for c in first_run), list(range(len(first_run))))
+        self.assertEqual([(c.id, c.pnormal_form, c.llinked) for c in first_run],
+                         [(c.id, c.pnormal_form, c.llinked) for c in second_run])
+        batched_run = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True, memory_limit=1)
+        self.assertEqual([(c.id, c.collocation, c.freq, c.llinked) for c in first_run],
+                         [(c.id, c.collocation, c.freq, c.llinked) for c in batched_run])
 #  Основная задача его заключается в непосредственной поддержке стрелковых рот и сопровождении их огнем и движением
 
     def test_collocation_retrieval(self):
@@ -220,6 +267,26 @@ class TestLinguisticFilter(unittest.TestCase):
 
         # </editor-fold>
 
+    def test_sentence_preparation(self):
+        sentence = [TaggedWord(word='Огонь', pos=PartOfSpeech.noun, case=Case.nominative, normalized='огонь'),
+                    TaggedWord(word='артиллерии', pos=PartOfSpeech.noun, case=Case.genitive, normalized='артиллерия'),
+                    Separator(symbol=','),
+                    TaggedWord(word='П', pos=PartOfSpeech.noun, case=Case.nominative, normalized='п'),
+                    TaggedWord(word='минометы', pos=PartOfSpeech.noun, case=Case.nominative, normalized='миномёт'),
+                    TaggedWord(word='и', pos=PartOfSpeech.conjunction, case=Case.none, normalized='и'),
+                    TaggedWord(word='12', pos=PartOfSpeech.numeral, case=Case.none, normalized='12'),
+                    TaggedWord(word='пулеметы', pos=PartOfSpeech.noun, case=Case.nominative, normalized='пулемёт')]
+        sentence_copy = list(sentence)
+        runs = prepare_sentence(sentence)
+
+        self.assertEqual(sentence, sentence_copy)
+        self.assertEqual([run.forms for run in runs], [('огонь', 'артиллерии'), ('минометы', 'и', 'пулеметы')])
+        self.assertEqual(runs[1].normal_forms, ('миномёт', 'и', 'пулемёт'))
+        self.assertEqual(runs[0].pos, (PartOfSpeech.noun, PartOfSpeech.noun))
+        self.assertEqual(prepare_sentence([Separator(symbol='('), Separator(symbol=')')]), [])
+        with self.assertRaises(TypeError):
+            prepare_sentence(sentence + ['строка'])
+
     def test_one_letter_retrieve_collocation(self):
         text_part = ' П р и м е ч а н и е. Указания хранить в штабах полков, дивизий и корпусов. Военный Совет Армии П Р И К А З Ы В А Е Т:'
         tag_info = Runner.parse_text(text_part)
@@ -1,22 +1,102 @@
-from ITermExtractor.linguistic_filter import NounPlusLinguisticFilter
+from ITermExtractor.linguistic_filter import NounPlusLinguisticFilter, AdjNounLinguisticFilter, define_collocation_links
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from ITermExtractor.candidate_store import CandidateStore
+from ITermExtractor.Structures.WordStructures import Collocation
+import ITermExtractor.Morph as m
 import ITermExtractor.stat.cvalue as cvalue
 import Runner
+from benchmarks.synthetic import generate_candidates
+import math
+import os
 import unittest
 
 
 class TestStatMethod(unittest.TestCase):
-    @unittest.skip("not for now")
     def test_threaded_results(self):
-        with open("../../data/input_text.txt", mode="rt", encoding="utf-8") as f:
+        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'default-doc.txt')
+        with open(filename, mode="rt", encoding="utf-8") as f:
             input_text = f.read()
         tagged_sentence_list = Runner.parse_text(input_text=input_text)
         filter1 = NounPlusLinguisticFilter()
-        terms1 = filter1.filter_text(tagged_sentence_list)
-        cvalue.threshold = 0.5
-        cvalue_res_1 = cvalue.calculate(terms1, is_single_threaded=True)
-        cvalue_res_2 = cvalue.calculate(terms1, is_single_threaded=False)
-        self.assertEqual(len(cvalue_res_1), len(cvalue_res_2))
-        self.assertEqual(cvalue_res_1, cvalue_res_2)
+        terms1 = filter1.filter_text(tagged_sentence_list, is_single_threaded=True)
+        graph = CandidateGraph(terms1)
+        for threshold in [0, 0.5, 3]:
+            cvalue_res_1 = cvalue.calculate(terms1, is_single_threaded=True, graph=graph, threshold=threshold)
+            cvalue_res_2 = cvalue.calculate(terms1, is_single_threaded=False, graph=graph, threshold=threshold)
+            self.assertEqual(len(cvalue_res_1), len(cvalue_res_2))
+            self.assertEqual(cvalue_res_1, cvalue_res_2)
+            self.assertEqual(cvalue_res_1, cvalue.calculate_vectorized(terms1, graph, threshold))
+
+    def test_worker_ranges(self):
+        sentences = [m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника'),
+                     m.tag_collocation('огнем полковой артиллерии'),
+                     m.tag_collocation('огневые точки противника уничтожены огнем артиллерии')]
+        terms = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True)
+        cvalue.set_threshold(0)
+        graph = CandidateGraph(terms)
+        self.assertEqual(cvalue.calculate(terms, is_single_threaded=False, graph=graph),
+                         cvalue.calculate(terms, is_single_threaded=True, graph=graph))
+
+    def test_balanced_tasks(self):
+        terms = define_collocation_links(generate_candidates(3000))
+        expected_results = cvalue.calculate_vectorized(terms, threshold=0)
+        self.assertEqual(cvalue.calculate(terms, is_single_threaded=True, threshold=0), expected_results)
+        self.assertEqual(cvalue.calculate(terms, is_single_threaded=False, threshold=0), expected_results)
+
+    def test_top_k(self):
+        sentences = [m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника'),
+                     m.tag_collocation('огнем полковой артиллерии'),
+                     m.tag_collocation('огневые точки противника уничтожены огнем артиллерии')]
+        terms = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True)
+        cvalue.set_threshold(0)
+        expected_results = cvalue.calculate(terms, is_single_threaded=True)
+        self.assertEqual(cvalue.calculate(terms, is_single_threaded=True, top_k=3), expected_results[:3])
+        groups = list(cvalue.calculate_by_length(terms, is_single_threaded=True, top_k=1))
+        self.assertEqual([wordcount for wordcount, group in groups], [3, 2])  # log2(1) = 0: одиночные слова отброшены
+        self.assertTrue(all(len(group) <= 1 for wordcount, group in groups))
+
+    def test_vectorized_results(self):
+        candidates = [Collocation('ведения огня артиллерии', 3, 2, 'ведение огонь артиллерия', [], 0),
+                      Collocation('огня артиллерии', 2, 5, 'огонь артиллерия', [0], 1),
+                      Collocation('огонь', 1, 9, 'огонь', [1, 0], 2),
+                      Collocation('артиллерия', 1, 4, 'артиллерия', [1, 0], 3),
+                      Collocation('огневой вал', 2, 3, 'огневой вал', [42], 4)]
+        expected_results = [cvalue.params('ведения огня артиллерии', 2 * math.log(3, 2)),
+                            cvalue.params('огня артиллерии', 3.0)]
+        self.assertEqual(cvalue.calculate_vectorized(candidates, threshold=1), expected_results)
+        self.assertEqual([term.name for term in cvalue.calculate_vectorized(candidates, threshold=-10)],
+                         ['ведения огня артиллерии', 'огня артиллерии', 'огонь', 'артиллерия'])
+
+    def test_incremental_index(self):
+        sentences = [m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника'),
+                     m.tag_collocation('огнем полковой артиллерии'),
+                     m.tag_collocation('огневые точки противника уничтожены огнем артиллерии')]
+        store = CandidateStore(AdjNounLinguisticFilter())
+        index = cvalue.CValueIndex()
+        index.update(store.append(sentences[:2]))
+        self.assertEqual(index.terms(-10), cvalue.calculate_vectorized(store.candidates(), threshold=-10))
+
+        touched = store.append(sentences[2:])
+        self.assertLess(index.update(touched), len(store))
+        self.assertEqual(index.terms(-10), cvalue.calculate_vectorized(store.candidates(), threshold=-10))
+        self.assertEqual(index.get('огонь артиллерия'), 1.0)
+        self.assertIsNone(index.get('огневой вал'))
+
+    def test_threshold_per_call(self):
+        candidates = [Collocation('ведения огня артиллерии', 3, 2, 'ведение огонь артиллерия', [], 0),
+                      Collocation('огня артиллерии', 2, 5, 'огонь артиллерия', [0], 1),
+                      Collocation('огневой вал', 2, 1, 'огневой вал', [42], 2)]
+        cvalue.set_threshold(0)
+        graph = CandidateGraph(candidates)
+        self.assertEqual(cvalue.calculate(candidates, is_single_threaded=True, threshold=3),
+                         [cvalue.params('ведения огня артиллерии', 2 * math.log(3, 2))])
+        self.assertEqual(cvalue.calculate_by_group([0, 1, 2], graph, threshold=2.9),
+                         [cvalue.params('ведения огня артиллерии', 2 * math.log(3, 2)),
+                          cvalue.params('огня артиллерии', 3.0)])
+        # оценка сверху для 'огневой вал' (1.0) ниже порога: битая ссылка даже не разбирается
+        self.assertEqual(cvalue.calculate_values([2], *graph.arrays(), 1), [])
+        self.assertEqual(cvalue.calculate_values([2], *graph.arrays(), 0.5), [(2, None)])
+        self.assertEqual(cvalue.THRESHOLD, 0)
 
     def test_threshold_property(self):
         cvalue.set_threshold(0)
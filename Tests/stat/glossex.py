@@ -1,11 +1,56 @@
 from ITermExtractor.linguistic_filter import NounPlusLinguisticFilter
-import ITermExtractor.stat.glossex
+from ITermExtractor.Structures.WordStructures import CorpusStatistics, TaggedWord
+import ITermExtractor.Morph as m
+import ITermExtractor.stat.glossex as glossex
+import ITermExtractor.executor as executor
 import unittest
+import math
 
 
 class TestStatMethod(unittest.TestCase):
+    def setUp(self):
+        self.documents = [[m.tag_collocation('огонь артиллерии планировать в соответствии с обеспеченностью'),
+                           m.tag_collocation('огонь артиллерии по пехоте противника')],
+                          [m.tag_collocation('система огня должна обеспечить непроницаемость боевых порядков')]]
+        self.candidates = NounPlusLinguisticFilter().filter_text([s for d in self.documents for s in d],
+                                                                 is_single_threaded=True)
+
     def test_document_freq_calc(self):
-        pass
+        statistics = CorpusStatistics(self.documents)
+        words = [w.normalized for d in self.documents for s in d for w in s if isinstance(w, TaggedWord)]
+        first = [w.normalized for s in self.documents[0] for w in s if isinstance(w, TaggedWord)]
+        second = [w.normalized for s in self.documents[1] for w in s if isinstance(w, TaggedWord)]
+        self.assertAlmostEqual(statistics.probability('огонь'), words.count('огонь') / len(words))
+        self.assertAlmostEqual(statistics.max_document_probability('огонь'),
+                               max(first.count('огонь') / len(first), second.count('огонь') / len(second)))
+
+    def test_scores(self):
+        statistics = CorpusStatistics(self.documents)
+        result = glossex.calculate(self.candidates, self.documents, statistics)
+        self.assertEqual([term.name for term in result], [c.collocation for c in self.candidates])
+        term = result[[c.pnormal_form for c in self.candidates].index('огонь артиллерия')]
+        words = ['огонь', 'артиллерия']
+        expected_termhood = sum(math.log2(statistics.max_document_probability(w) / statistics.probability(w))
+                                for w in words) / 2
+        expected_unithood = 2 * 2 * math.log10(2) / sum(statistics.probability(w) * statistics.lexicon.part_count
+                                                        for w in words)
+        self.assertAlmostEqual(term.termhood, expected_termhood)
+        self.assertAlmostEqual(term.unithood, expected_unithood)
+        self.assertEqual(glossex.calculate(self.candidates, self.documents, is_single_threaded=True), result)
+        self.assertEqual(glossex.calculate(self.candidates, statistics=statistics), result)
+        self.assertRaises(ValueError, glossex.calculate, self.candidates)
+
+    def test_batches_in_pool(self):
+        statistics = CorpusStatistics(self.documents)
+        expected = glossex.calculate(self.candidates, statistics=statistics, is_single_threaded=True)
+        parallel_limit = glossex.PARALLEL_LIMIT
+        glossex.PARALLEL_LIMIT = 0
+        try:
+            executor.start(2)
+            self.assertEqual(glossex.calculate(self.candidates, statistics=statistics), expected)
+        finally:
+            glossex.PARALLEL_LIMIT = parallel_limit
+            executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+from ITermExtractor.Structures.ContextIndex import ContextIndex
+from ITermExtractor.linguistic_filter import AdjNounLinguisticFilter
+import ITermExtractor.Morph as m
+import ITermExtractor.stat.cvalue as cvalue
+import ITermExtractor.stat.ncvalue as ncvalue
+import unittest
+
+
+class TestStatMethod(unittest.TestCase):
+    def setUp(self):
+        sentences = [m.tag_collocation('огонь полковой артиллерии подавил огневые точки противника'),
+                     m.tag_collocation('огнем полковой артиллерии уничтожены огневые точки'),
+                     m.tag_collocation('огневые точки противника уничтожены огнем артиллерии')]
+        self.context = ContextIndex()
+        self.terms = AdjNounLinguisticFilter().filter_text(sentences, is_single_threaded=True, context=self.context)
+
+    def test_context_weights(self):
+        cvalues = cvalue.calculate(self.terms, is_single_threaded=True, threshold=0)
+        pnormal_forms = dict((term.collocation, term.pnormal_form) for term in self.terms)
+        contexts = [self.context.get(pnormal_forms[term.name]) for term in cvalues]
+        weights = dict((word, sum(word in words for words in contexts) / len(contexts)) for word in self.context.words)
+        expected = sorted(((term.name, 0.8 * term.cvalue + 0.2 * sum(count * weights[word]
+                                                                     for word, count in words.items()))
+                           for term, words in zip(cvalues, contexts)), key=lambda x: x[1], reverse=True)
+
+        result = ncvalue.calculate(self.terms, self.context, is_single_threaded=True, threshold=0)
+        self.assertEqual([term.name for term in result], [name for name, value in expected])
+        for term, (name, value) in zip(result, expected):
+            self.assertAlmostEqual(term.ncvalue, value)
+
+    def test_top_k(self):
+        result = ncvalue.calculate(self.terms, self.context, is_single_threaded=True, threshold=0)
+        self.assertEqual(ncvalue.calculate(self.terms, self.context, is_single_threaded=True, threshold=0, top_k=2),
+                         result[:2])
+        self.assertEqual(ncvalue.calculate(self.terms, ContextIndex(), is_single_threaded=True, threshold=0),
+                         [ncvalue.params(term.name, 0.8 * term.cvalue)
+                          for term in cvalue.calculate(self.terms, is_single_threaded=True, threshold=0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
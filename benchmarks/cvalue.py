@@ -0,0 +1,43 @@
+"""
+Замер времени подсчета c-value на синтетических перечнях от 1 тыс. до 1 млн кандидатов:
+поэлементный подсчет (cvalue.calculate в одном потоке) против векторного (cvalue.calculate_vectorized).
+Граф вложенности строится один раз и в замер не входит
+
+Запуск из корня проекта: python -m benchmarks.cvalue [размер ...]
+"""
+
+import logging
+import sys
+import time
+from typing import List
+
+import ITermExtractor.stat.cvalue as cvalue
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from ITermExtractor.linguistic_filter import define_collocation_links
+from benchmarks.synthetic import generate_candidates
+
+SIZES = [1000, 10000, 100000, 1000000]
+
+
+def measure(function, *args) -> (float, int):
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(result)
+
+
+def run(sizes: List[int]):
+    logging.disable(logging.INFO)
+    print("{0:>10} {1:>12} {2:>14} {3:>14} {4:>10}".format("кандидатов", "терминов", "поэлементно, с",
+                                                            "векторно, с", "ускорение"))
+    for size in sizes:
+        candidates = define_collocation_links(generate_candidates(size))
+        graph = CandidateGraph(candidates)
+        serial, _ = measure(cvalue.calculate, candidates, True, graph, 0, 0)
+        vectorized, terms = measure(cvalue.calculate_vectorized, candidates, graph, 0)
+        print("{0:>10} {1:>12} {2:14.3f} {3:14.3f} {4:10.1f}".format(size, terms, serial, vectorized,
+                                                                     serial / vectorized))
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,127 @@
+"""
+Проверка совпадения и замер масштабирования c-value: поэлементный подсчет в одном процессе,
+в общем пуле процессов и векторный подсчет на синтетических перечнях растущего размера
+и с разной глубиной вложенности словосочетаний.
+Для каждого перечня результаты всех способов сравниваются между собой; время и пиковая память записываются в JSON,
+кривая масштабирования строится в png (если установлен matplotlib).
+Пиковая память - по tracemalloc в основном процессе, отдельным прогоном (трассировка замедляет подсчет);
+память процессов пула в нее не входит
+
+Запуск из корня проекта: python -m benchmarks.cvalue_scaling [размер ...]
+Результаты: result/cvalue_scaling.json, result/cvalue_scaling.png; код возврата 1 - результаты расходятся
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import List
+
+import ITermExtractor.executor as executor
+import ITermExtractor.stat.cvalue as cvalue
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from ITermExtractor.linguistic_filter import define_collocation_links
+from benchmarks.synthetic import generate_candidates
+
+SIZES = [1000, 10000, 100000, 1000000]
+NESTING_DEPTHS = [1, 3]
+THRESHOLD = 0
+RESULT_DIRECTORY = 'result'
+
+ENGINES = {
+    'serial': lambda candidates, graph: cvalue.calculate(candidates, True, graph, threshold=THRESHOLD),
+    'multiprocess': lambda candidates, graph: cvalue.calculate(candidates, False, graph, threshold=THRESHOLD),
+    'vectorized': lambda candidates, graph: cvalue.calculate_vectorized(candidates, graph, THRESHOLD),
+}
+
+
+def measure_time(engine, candidates, graph) -> (float, list):
+    start = time.perf_counter()
+    result = engine(candidates, graph)
+    return time.perf_counter() - start, result
+
+
+def measure_memory(engine, candidates, graph) -> int:
+    tracemalloc.start()
+    try:
+        engine(candidates, graph)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes: List[int], depths: List[int]) -> List[dict]:
+    """
+    :param sizes: размеры перечней
+    :param depths: глубины вложенности, см. generate_candidates
+    :return: записи замеров: размер, глубина, число ссылок, совпадение результатов, время и память каждого способа
+    """
+    records = []
+    print("{0:>10} {1:>8} {2:>14} {3:>10} {4:>12} {5:>10}".format("кандидатов", "глубина", "способ", "время, с",
+                                                                     "память, МБ", "совпадает"))
+    for depth in depths:
+        for size in sizes:
+            candidates = define_collocation_links(generate_candidates(size, nesting_depth=depth))
+            graph = CandidateGraph(candidates)
+            record = {'size': size, 'nesting_depth': depth, 'links': int(graph.offsets[-1]), 'engines': dict()}
+            expected = None
+            for name, engine in ENGINES.items():
+                elapsed, result = measure_time(engine, candidates, graph)
+                expected = result if expected is None else expected
+                record['engines'][name] = {'seconds': elapsed, 'peak_bytes': measure_memory(engine, candidates, graph),
+                                           'terms': len(result), 'identical': result == expected}
+                print("{0:>10} {1:>8} {2:>14} {3:10.3f} {4:12.1f} {5:>10}"
+                      .format(size, depth, name, elapsed, record['engines'][name]['peak_bytes'] / 2 ** 20,
+                              "да" if result == expected else "НЕТ"))
+            record['identical'] = all(info['identical'] for info in record['engines'].values())
+            records.append(record)
+    return records
+
+
+def save_json(filename: str, records: List[dict]):
+    with open(filename, mode="wt", encoding="utf-8") as f:
+        json.dump({'processes': executor.get_pool_size(), 'threshold': THRESHOLD, 'records': records}, f,
+                  ensure_ascii=False, indent=2)
+
+
+def plot(filename: str, records: List[dict]) -> bool:
+    """
+    Строит время подсчета от размера перечня (логарифмические оси), по линии на способ и глубину вложенности
+    :return: False - matplotlib не установлен
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        logging.warning("matplotlib не установлен, график не построен")
+        return False
+    figure, axes = plt.subplots()
+    for depth in sorted(set(record['nesting_depth'] for record in records)):
+        selected = [record for record in records if record['nesting_depth'] == depth]
+        for name in ENGINES:
+            axes.plot([record['size'] for record in selected],
+                      [record['engines'][name]['seconds'] for record in selected],
+                      marker='o', label="{0}, глубина {1}".format(name, depth))
+    axes.set_xscale('log')
+    axes.set_yscale('log')
+    axes.set_xlabel("кандидатов")
+    axes.set_ylabel("время, с")
+    axes.set_title("Масштабирование c-value ({0} процессов)".format(executor.get_pool_size()))
+    axes.legend()
+    figure.savefig(filename)
+    plt.close(figure)
+    return True
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    os.makedirs(RESULT_DIRECTORY, exist_ok=True)
+    executor.start()
+    results = run([int(arg) for arg in sys.argv[1:]] or SIZES, NESTING_DEPTHS)
+    executor.shutdown()
+    save_json(os.path.join(RESULT_DIRECTORY, 'cvalue_scaling.json'), results)
+    plot(os.path.join(RESULT_DIRECTORY, 'cvalue_scaling.png'), results)
+    sys.exit(0 if all(record['identical'] for record in results) else 1)
@@ -0,0 +1,64 @@
+"""
+Замер времени расстановки ссылок на более длинные словосочетания (define_collocation_links)
+на синтетических перечнях от 1 тыс. до 1 млн кандидатов.
+Для сравнения на малых объемах замеряется прежний алгоритм с попарным поиском подстрок
+
+Запуск из корня проекта: python -m benchmarks.links [размер ...]
+"""
+
+import copy
+import sys
+import time
+from itertools import groupby
+from operator import itemgetter
+from typing import List
+
+from ITermExtractor.Structures.WordStructures import Collocation
+from ITermExtractor.linguistic_filter import define_collocation_links
+from benchmarks.synthetic import generate_candidates
+
+SIZES = [1000, 10000, 100000, 1000000]
+LEGACY_LIMIT = 10000
+
+
+def substring_links(collocations: List[Collocation]) -> List[Collocation]:
+    """
+    Прежний алгоритм: для каждого кандидата просматриваются все кандидаты большей длины
+    """
+    grouped_by_len = {}
+    lengths = []
+    cloned = copy.deepcopy(collocations)
+    sorted_collocations = sorted(cloned, key=itemgetter('wordcount'))
+    collocations_dict = dict([(c.id, c) for c in sorted_collocations])
+    for key, value_sitter in groupby(sorted_collocations, key=itemgetter('wordcount')):
+        grouped_by_len[key] = list(value_sitter)
+        lengths.append(key)
+    lengths = sorted(lengths)
+    for curr_len in lengths:
+        for collocation in grouped_by_len[curr_len]:
+            containers = []
+            for j in range(curr_len, len(lengths)):
+                containers += [hl_coll for hl_coll in grouped_by_len[lengths[j]]
+                               if collocation.pnormal_form in hl_coll.pnormal_form]
+            collocations_dict[collocation.id].llinked = [c.id for c in containers]
+    return list(collocations_dict.values())
+
+
+def measure(function, candidates: List[Collocation]) -> (float, int):
+    start = time.perf_counter()
+    result = function(candidates)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(len(c.llinked) for c in result)
+
+
+def run(sizes: List[int]):
+    print("{0:>10} {1:>12} {2:>14} {3:>14}".format("кандидатов", "ссылок", "индекс, с", "подстроки, с"))
+    for size in sizes:
+        candidates = generate_candidates(size)
+        elapsed, links = measure(define_collocation_links, candidates)
+        legacy = "{0:14.3f}".format(measure(substring_links, candidates)[0]) if size <= LEGACY_LIMIT else "{0:>14}".format("-")
+        print("{0:>10} {1:>12} {2:14.3f} {3}".format(size, links, elapsed, legacy))
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,46 @@
+"""
+Генерация синтетических перечней терминологических кандидатов для замеров производительности
+"""
+
+import random
+from typing import List
+
+from ITermExtractor.Structures.WordStructures import Collocation
+
+
+def generate_candidates(count: int, max_words: int = 5, nesting_depth: int = 1, vocabulary_size: int = 0,
+                        seed: int = 0) -> List[Collocation]:
+    """
+    Генерирует перечень уникальных кандидатов со случайными частотами
+    :param count: количество кандидатов
+    :param max_words: максимальная длина словосочетания
+    :param nesting_depth: сколько уровней вложенных подсловосочетаний порождает каждое сгенерированное словосочетание
+    :param vocabulary_size: размер словаря, по умолчанию растет вместе с count
+    :param seed: зерно генератора случайных чисел
+    :return: кандидаты с id 0..count-1
+    """
+    rnd = random.Random(seed)
+    if vocabulary_size <= 0:
+        vocabulary_size = max(50, 4 * int(count ** 0.5))
+    vocabulary = ['слово{0}'.format(i) for i in range(vocabulary_size)]
+    lengths = list(range(1, max_words + 1))
+    weights = [max_words - length + 1 for length in lengths]
+
+    phrases = dict()
+    while len(phrases) < count:
+        phrase = tuple(rnd.choice(vocabulary) for i in range(rnd.choices(lengths, weights)[0]))
+        phrases[phrase] = True
+        for level in range(nesting_depth):
+            if len(phrase) < 2 or len(phrases) >= count:
+                break
+            length = rnd.randint(1, len(phrase) - 1)
+            start = rnd.randint(0, len(phrase) - length)
+            phrase = phrase[start:start + length]
+            phrases[phrase] = True
+
+    candidates = []
+    for i, phrase in enumerate(phrases):
+        text = ' '.join(phrase)
+        candidates.append(Collocation(collocation=text, wordcount=len(phrase), freq=1 + int(rnd.expovariate(1.0)),
+                                      pnormal_form=text, llinked=list(), cid=i))
+    return candidates
@@ -1,38 +1,29 @@
-from typing import List, Any
+from typing import List, Any, Iterable, Callable
 from operator import itemgetter
+import heapq
 import re
-import logging
 
 from ITermExtractor.Structures.WordStructures import TaggedWord, contains_sentence
 
-LIMIT_PER_PROCESS = 80
-THREAD_LIMIT = 8
 document_title_re = re.compile('^([А-Я/\d,№()–-]{1,20}[\s\n]){3,}', re.MULTILINE)
 
 
-def split_tasks(task_list: List[Any], processes: int=0):
+def select_top(items: Iterable[Any], top_k: int = 0, key: Callable = None) -> List[Any]:
     """
-    Разделяет список на несколько для равномерного разделения процессов на параллельные потоки
-    :param task_list: входной список
-    :return: разделенный список
+    Отбирает наибольшие элементы ограниченной кучей вместо полной сортировки
+    :param items: элементы
+    :param top_k: сколько элементов оставить, 0 - все
+    :param key: функция ключа сравнения
+    :return: элементы по убыванию ключа (при равенстве - в исходном порядке)
+
+    >>> select_top([('а', 1), ('б', 3), ('в', 2), ('г', 3)], 2, key=itemgetter(1))
+    [('б', 3), ('г', 3)]
+    >>> select_top([1, 3, 2])
+    [3, 2, 1]
     """
-    length = len(task_list)
-    threads = 1
-    data_array_limit = LIMIT_PER_PROCESS
-    if processes == 0:
-        if length > LIMIT_PER_PROCESS:
-            threads = int(length / LIMIT_PER_PROCESS) + 1
-            threads = THREAD_LIMIT if threads > THREAD_LIMIT else threads
-            data_array_limit = int(length / threads)
-            logging.debug('Настроили количество потоков и список задач: {0} потоков по {1} строк'.format(threads, data_array_limit))
-    else:
-        threads = processes
-        data_array_limit = int(length / threads)
-    if threads == 1:
-        split_list = [task_list]
-    else:
-        split_list = [task_list[data_array_limit * i:data_array_limit * (i + 1)] for i in range(threads)]
-    return split_list
+    if top_k > 0:
+        return heapq.nlargest(top_k, items, key=key)
+    return sorted(items, key=key, reverse=True)
 
 
 def remove_spans(term: str, spans: list) -> str:
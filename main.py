@@ -3,19 +3,23 @@ import logging
 import os
 import pickle
 from operator import itemgetter
-from typing import List, Tuple
+from typing import List, Tuple, Iterable
 
+import ITermExtractor.executor as executor
 import ITermExtractor.stat.cvalue as cvalue
 import ITermExtractor.stat.glossex as glossex
 import ITermExtractor.stat.kfactor as kfactor
+import ITermExtractor.stat.ncvalue as ncvalue
 import Runner
 import logger_settings
-from ITermExtractor.Structures.WordStructures import TaggedWord
+from ITermExtractor.Structures.CandidateGraph import CandidateGraph
+from ITermExtractor.Structures.ContextIndex import ContextIndex
+from ITermExtractor.Structures.WordStructures import TaggedWord, CorpusStatistics
 from ITermExtractor.linguistic_filter import Collocation
-from ITermExtractor.linguistic_filter import (NounPlusLinguisticFilter, AdjNounLinguisticFilter)
+from ITermExtractor.linguistic_filter import (NounPlusLinguisticFilter, AdjNounLinguisticFilter, prepare_text)
 from ITermExtractor.stoplist import StopList
 from TextImporter import (DefaultTextImporter, PlainTextImporter, PdfHtmlTextImporter, FileArrayImporter)
-from helpers import get_documents
+from helpers import get_documents, select_top
 
 
 def save_text_raw_terms(filename: str, input_list: List[Collocation], is_short_version: bool = False):
@@ -52,19 +56,41 @@ def open_raw_terms(filename: str) -> List[Collocation]:
 
 def save_text_stat(filename: str, input_list: List[cvalue.params]):
     with open(file=filename, mode="wt", encoding="utf-8") as f:
-        data = []
-        for line in input_list:
-            pattern = "{0} = {1}{2}"
-            if isinstance(line, cvalue.params):
-                data.append(pattern.format(line.name, round(line.cvalue, 3), os.linesep))
-            elif isinstance(line, Collocation):
-                data.append(pattern.format(line.collocation, round(line.freq, 3), os.linesep))
-            elif isinstance(line, glossex.params):
-                val = 0.2 * line.termhood + 0.8 * line.unithood
-                data.append("{0} (=) t={1}, u={2} val={3}{4}".format(line.name, round(line.termhood, 3),
-                                                                     round(line.unithood, 3), round(val, 3),
-                                                                     os.linesep))
-        f.writelines(data)
+        f.writelines(format_text_stat(input_list))
+
+
+def save_text_stat_by_length(filename: str, groups: Iterable[Tuple[int, List[cvalue.params]]]) -> List[cvalue.params]:
+    """
+    Записывает результаты по мере подсчета групп кандидатов одной длины
+    :param filename: имя файла
+    :param groups: (длина, результаты группы), см. cvalue.calculate_by_length
+    :return: результаты всех групп
+    """
+    result = []
+    with open(file=filename, mode="wt", encoding="utf-8") as f:
+        for wordcount, group in groups:
+            f.writelines(format_text_stat(group))
+            f.flush()
+            result += group
+    return result
+
+
+def format_text_stat(input_list: List[cvalue.params]) -> List[str]:
+    data = []
+    for line in input_list:
+        pattern = "{0} = {1}{2}"
+        if isinstance(line, cvalue.params):
+            data.append(pattern.format(line.name, round(line.cvalue, 3), os.linesep))
+        elif isinstance(line, ncvalue.params):
+            data.append(pattern.format(line.name, round(line.ncvalue, 3), os.linesep))
+        elif isinstance(line, Collocation):
+            data.append(pattern.format(line.collocation, round(line.freq, 3), os.linesep))
+        elif isinstance(line, glossex.params):
+            val = 0.2 * line.termhood + 0.8 * line.unithood
+            data.append("{0} (=) t={1}, u={2} val={3}{4}".format(line.name, round(line.termhood, 3),
+                                                                 round(line.unithood, 3), round(val, 3),
+                                                                 os.linesep))
+    return data
 
 
 def open_text_stat(filename: str) -> List[Tuple[str, float]]:
@@ -138,11 +164,17 @@ if __name__ == "__main__":
     RERUN_FILTER_1 = True
     RERUN_FILTER_2 = True
     USE_CVALUE_1 = USE_CVALUE_2 = USE_KFACTOR_1 = USE_KFACTOR_2 = USE_GLOSSEX_1 = USE_GLOSSEX_2 = False
+    USE_NCVALUE_1 = USE_NCVALUE_2 = False
+    CANDIDATE_MEMORY_LIMIT = 0  # словоформ в памяти до сброса на диск при фильтрации, 0 - без ограничений
+    PROCESSES = 0  # размер общего пула процессов, 0 - по числу процессоров
+    TOP_K = 0  # сколько лучших терминов сохранять, 0 - все
+    CVALUE_THRESHOLD = 0  # порог c-value
 
     logger_settings.setup()
     logger = logging.getLogger()
     # logger = logger_settings.get_logger()
     logger.info("\n============================================Запуск==============================================\n")
+    executor.start(PROCESSES)
 
     # choice_single_thread = input_menu("Обрабатывать данные в одном потоке?", ["Да", "Нет"]) == 1
 
@@ -195,7 +227,7 @@ if __name__ == "__main__":
     choice_stoplist = input_menu("Использовать стоп-лист?", ["Да", "Нет"]) == 1
 
     options = ['c-value с Noun+ фильтром', 'c-value с Adj|Noun фильтром', 'kfactor Noun+', 'kfactor Adj|Noun',
-               'GlossEx Noun+', 'GlossEx Adj|Noun', 'закончить выбор']
+               'GlossEx Noun+', 'GlossEx Adj|Noun', 'nc-value Noun+', 'nc-value Adj|Noun', 'закончить выбор']
     choice_algorithms = -1
     while choice_algorithms != len(options):
         choice_algorithms = input_menu("Выбор алгоритмов", options, show_options=choice_algorithms == -1)
@@ -205,9 +237,11 @@ if __name__ == "__main__":
         USE_KFACTOR_2 = USE_KFACTOR_2 or choice_algorithms == 4
         USE_GLOSSEX_1 = USE_GLOSSEX_1 or choice_algorithms == 5
         USE_GLOSSEX_2 = USE_GLOSSEX_2 or choice_algorithms == 6
+        USE_NCVALUE_1 = USE_NCVALUE_1 or choice_algorithms == 7
+        USE_NCVALUE_2 = USE_NCVALUE_2 or choice_algorithms == 8
 
-        USE_FILTER_1 = USE_CVALUE_1 or USE_KFACTOR_1 or USE_GLOSSEX_1
-        USE_FILTER_2 = USE_CVALUE_2 or USE_KFACTOR_2 or USE_GLOSSEX_2
+        USE_FILTER_1 = USE_CVALUE_1 or USE_KFACTOR_1 or USE_GLOSSEX_1 or USE_NCVALUE_1
+        USE_FILTER_2 = USE_CVALUE_2 or USE_KFACTOR_2 or USE_GLOSSEX_2 or USE_NCVALUE_2
     print("Выбор осуществлен")
     documents = []
     tagged_documents = []
@@ -245,17 +279,29 @@ if __name__ == "__main__":
                 f.write(input_text)
             logger.info("Теги сохранены в файл")
 
+    # частоты по документам и словарь нормальных форм корпуса - за один проход
+    corpus_statistics = CorpusStatistics(tagged_documents)
+    lexicon = corpus_statistics.lexicon
+    logger.info("Словарь нормальных форм построен, различных слов {0}".format(len(lexicon)))
+
     logger.debug("Начало извлечения списка терминов")
+    is_filtering = (USE_FILTER_1 and RERUN_FILTER_1) or (USE_FILTER_2 and RERUN_FILTER_2)
+    prepared_text = prepare_text(tagged_sentence_list) if is_filtering else []
+    # контекстные слова для nc-value собираются фильтром в том же проходе
+    context1 = ContextIndex() if USE_NCVALUE_1 and RERUN_FILTER_1 else None
+    context2 = ContextIndex() if USE_NCVALUE_2 and RERUN_FILTER_2 else None
     if USE_FILTER_1 and RERUN_FILTER_1:
         logger.info("Фильтр 1: Начало")
         filter1 = NounPlusLinguisticFilter()
-        terms1 = filter1.filter_text(tagged_sentence_list)
+        terms1 = filter1.filter_text(tagged_sentence_list, prepared_text=prepared_text, lexicon=lexicon,
+                                     memory_limit=CANDIDATE_MEMORY_LIMIT, context=context1)
         logger.info("Фильтр 1: список терминов извлечен")
 
     if USE_FILTER_2 and RERUN_FILTER_2:
         logger.info("Фильтр 2: Начало")
         filter2 = AdjNounLinguisticFilter()
-        terms2 = filter2.filter_text(tagged_sentence_list)  # choice_single_thread
+        terms2 = filter2.filter_text(tagged_sentence_list, prepared_text=prepared_text, lexicon=lexicon,
+                                     memory_limit=CANDIDATE_MEMORY_LIMIT, context=context2)  # choice_single_thread
         logger.info("Фильтр 2: список терминов извлечен")
 
     if choice_stoplist:
@@ -279,37 +325,56 @@ if __name__ == "__main__":
         save_text_raw_terms(os.path.join('result', 'inter-adj_noun.txt'),
                             sorted(filtered_terms2, key=itemgetter('wordcount'), reverse=True))
     logger.info("Данные записаны")
-
-    dictionary = [word for sentence in tagged_sentence_list for word in sentence]
+    graph1 = CandidateGraph(filtered_terms1)
+    graph2 = CandidateGraph(filtered_terms2)
 
     logger.info("Подсчитываем cvalue")
     track_time("cvalue")
-    cvalue.set_threshold(0)
+    # результаты каждой группы длины записываются сразу, итоговый перечень - после подсчета всех групп
     if USE_FILTER_1 and USE_CVALUE_1:
         logger.info("Переход к подчету, фильтр 1, к обработке {0}".format(len(filtered_terms1)))
-        cvalue_res_1 = cvalue.calculate(filtered_terms1)
+        cvalue_res_1 = save_text_stat_by_length(os.path.join('result', 'cvalue_noun_plus_by_length.txt'),
+                                                cvalue.calculate_by_length(filtered_terms1, graph=graph1, top_k=TOP_K,
+                                                                            threshold=CVALUE_THRESHOLD))
     track_time("cvalue")
     if USE_FILTER_2 and USE_CVALUE_2:
         logger.info("Переход к подчету, фильтр 2, к обработке {0}".format(len(filtered_terms2)))
-        cvalue_res_2 = cvalue.calculate(filtered_terms2)
+        cvalue_res_2 = save_text_stat_by_length(os.path.join('result', 'cvalue_adj_noun_by_length.txt'),
+                                                cvalue.calculate_by_length(filtered_terms2, graph=graph2, top_k=TOP_K,
+                                                                            threshold=CVALUE_THRESHOLD))
     track_time("cvalue")
 
     logger.info("Подсчет закончен, сохраняем результаты в файл")
     if USE_FILTER_1 and USE_CVALUE_1:
-        save_text_stat(os.path.join('result', 'cvalue_noun_plus.txt'), cvalue_res_1)
+        save_text_stat(os.path.join('result', 'cvalue_noun_plus.txt'),
+                       select_top(cvalue_res_1, TOP_K, key=itemgetter(1)))
     if USE_FILTER_2 and USE_CVALUE_2:
-        save_text_stat(os.path.join('result', 'cvalue_adj_noun.txt'), cvalue_res_2)
+        save_text_stat(os.path.join('result', 'cvalue_adj_noun.txt'),
+                       select_top(cvalue_res_2, TOP_K, key=itemgetter(1)))
+
+    if USE_NCVALUE_1 or USE_NCVALUE_2:
+        logger.info("Подсчитываем nc-value")
+    for is_used, context, terms, graph, name in [(USE_NCVALUE_1, context1, filtered_terms1, graph1, 'noun_plus'),
+                                                 (USE_NCVALUE_2, context2, filtered_terms2, graph2, 'adj_noun')]:
+        if not is_used:
+            continue
+        if context is None:
+            logger.warning("Контекстные слова собираются только при повторном запуске фильтра, nc-value ({0}) "
+                           "не подсчитан".format(name))
+            continue
+        ncvalue_res = ncvalue.calculate(terms, context, graph, threshold=CVALUE_THRESHOLD, top_k=TOP_K)
+        save_text_stat(os.path.join('result', 'ncvalue_{0}.txt'.format(name)), ncvalue_res)
 
     logger.info("Подсчитываем kfactor, фильтр 1, к обработке {0}".format(len(filtered_terms1)))
     track_time("kfactor")
     if USE_FILTER_1 and USE_KFACTOR_1:
-        kfactor_res_1 = kfactor.calculate(filtered_terms1, dictionary)
+        kfactor_res_1 = kfactor.calculate(filtered_terms1, graph1, top_k=TOP_K)
         logging.info("Подсчет закончен, сохраняем результаты в файл")
         save_text_stat(os.path.join('result', 'kfactor_noun_plus.txt'), kfactor_res_1)
     track_time("kfactor")
     logger.info("Подсчитываем kfactor, фильтр 2, к обработке {0}".format(len(filtered_terms2)))
     if USE_FILTER_2 and USE_KFACTOR_2:
-        kfactor_res_2 = kfactor.calculate(filtered_terms2, dictionary)
+        kfactor_res_2 = kfactor.calculate(filtered_terms2, graph2, top_k=TOP_K)
         logging.info("Подсчет закончен, сохраняем результаты в файл")
         save_text_stat(os.path.join('result', 'kfactor_adj_noun.txt'), kfactor_res_2)
     track_time("kfactor")
@@ -318,8 +383,7 @@ if __name__ == "__main__":
     track_time("glossex")
     if USE_GLOSSEX_1:
         logger.info("Переход к подчету, фильтр 1, к обработке {0}".format(len(filtered_terms1)))
-        # glossex_res_1 = glossex.threading_calculate(filtered_terms1, tagged_documents, multiprocessing.cpu_count())
-        glossex_res_1 = glossex.calculate(filtered_terms1, tagged_documents)
+        glossex_res_1 = glossex.calculate(filtered_terms1, statistics=corpus_statistics)
         save_text_stat(os.path.join('result', 'glossex_noun_plus_raw.txt'), glossex_res_1)
 
         glossex_res_1_clean = list(
@@ -329,8 +393,7 @@ if __name__ == "__main__":
 
     if USE_GLOSSEX_2:
         logger.info("Переход к подчету, фильтр 1, к обработке {0}".format(len(filtered_terms2)))
-        # glossex_res_2 = glossex.threading_calculate(filtered_terms2, tagged_documents, multiprocessing.cpu_count())
-        glossex_res_2 = glossex.calculate(filtered_terms2, tagged_documents)
+        glossex_res_2 = glossex.calculate(filtered_terms2, statistics=corpus_statistics)
         save_text_stat(os.path.join('result', 'glossex_adj_noun_raw.txt'), glossex_res_2)
 
         glossex_res_2_clean = list(
@@ -344,6 +407,7 @@ if __name__ == "__main__":
     logger.info("Из которых cvalue работал {0} c.".format(difference("cvalue")))
     logger.info("Из которых kfactor работал {0} c.".format(difference("kfactor")))
     logger.info("Из которых glossex работал {0} c.".format(difference("glossex")))
+    executor.shutdown()
     logger.info("Конец")
     print("Конец обработки данных")
 